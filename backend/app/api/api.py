@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from backend.app.api.endpoints import mindmaps, search, materials, forum, users, auth
+from backend.app.api.endpoints import mindmaps, search, materials, forum, users, auth, system
 
 api_router = APIRouter()
 
@@ -8,4 +8,5 @@ api_router.include_router(users.router, prefix="/users", tags=["用户"])
 api_router.include_router(mindmaps.router, prefix="/mindmaps", tags=["思维导图"])
 api_router.include_router(materials.router, prefix="/materials", tags=["资料"])
 api_router.include_router(forum.router, prefix="/forum", tags=["论坛"])
-api_router.include_router(search.router, prefix="/search", tags=["搜索"]) 
\ No newline at end of file
+api_router.include_router(search.router, prefix="/search", tags=["搜索"]) 
+api_router.include_router(system.router, prefix="/system", tags=["系统"])
@@ -1,14 +1,17 @@
-from typing import Generator, Optional
+import time
+from typing import AsyncGenerator, Generator, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from backend.app.db.session import SessionLocal
+from backend.app.db.session import SessionLocal, AsyncSessionLocal
 from backend.app.core.config import settings
+from backend.app.models.user import User
 from backend.app.schemas.user import UserInDB
-from backend.app.services.user import get_user_by_id
+from backend.app.services.user import get_user_by_id, user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_PREFIX}/auth/login")
 
@@ -22,29 +25,86 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    获取异步数据库会话（用于 async def 接口，等待查询时不占用线程池）
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> UserInDB:
     """
     获取当前用户
+    
+    已验证的令牌和对应的用户快照缓存 AUTH_CACHE_TTL 秒（不超过令牌有效期），
+    命中缓存时不需要解码令牌和查询数据库；用户信息变化时缓存由用户服务主动失效。
+    """
+    user = user_cache.get(token)
+    if user is None:
+        user = _authenticate(db, token)
+    
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="用户未激活",
+        )
+    
+    # 只读副本路由按用户判断是否需要读主库（写入后的一段时间内）
+    db.info["user_id"] = user.id
+    return user
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+) -> UserInDB:
+    """
+    获取当前用户（异步版本，与 get_current_user 共用缓存）
+    """
+    user = user_cache.get(token)
+    if user is None:
+        user_id, expires_at = _decode_token(token)
+        version = user_cache.version(user_id)
+        user = _snapshot(token, await db.get(User, user_id), version, expires_at)
+    
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="用户未激活",
+        )
+    
+    # 只读副本路由按用户判断是否需要读主库（写入后的一段时间内）
+    db.info["user_id"] = user.id
+    return user
+
+def _authenticate(db: Session, token: str) -> UserInDB:
+    user_id, expires_at = _decode_token(token)
+    # 在查询之前取版本号，查询期间用户被修改时不缓存旧数据
+    version = user_cache.version(user_id)
+    return _snapshot(token, get_user_by_id(db, user_id), version, expires_at)
+
+def _decode_token(token: str) -> Tuple[int, float]:
+    """
+    验证令牌，返回 (用户ID, 过期时间戳)
     """
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        user_id: int = payload.get("sub")
+        user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="无效的认证凭据",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-    except (JWTError, ValidationError):
+        return int(user_id), payload.get("exp", 0)
+    except (JWTError, ValidationError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="无效的认证凭据",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    user = get_user_by_id(db, user_id)
+
+def _snapshot(token: str, user: Optional[User], version: int, expires_at: float) -> UserInDB:
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -52,13 +112,11 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="用户未激活",
-        )
-    
-    return user
+    snapshot = UserInDB.model_validate(user)
+    ttl = min(settings.AUTH_CACHE_TTL, expires_at - time.time())
+    if ttl > 0:
+        user_cache.set(token, snapshot, version, ttl)
+    return snapshot
 
 def get_current_admin(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
     """
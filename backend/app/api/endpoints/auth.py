@@ -1,19 +1,20 @@
 from typing import Any
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from backend.app.api import deps
 from backend.app.core.config import settings
-from backend.app.core.security import create_access_token, verify_password
-from backend.app.services.user import get_user_by_email, create_user
+from backend.app.core.security import create_access_token, verify_and_update_password
+from backend.app.services.user import get_user_by_email, create_user, update_password_hash
 from backend.app.schemas.user import User, UserCreate, Token
 
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     db: Session = Depends(deps.get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
@@ -22,18 +23,24 @@ def login(
     
     - **username**: 用户邮箱
     - **password**: 用户密码
+    
+    密码校验在独立的线程池中执行，等待期间不占用请求线程。
     """
-    user = get_user_by_email(db, email=form_data.username)
+    user = await run_in_threadpool(get_user_by_email, db, email=form_data.username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户名或密码错误"
         )
-    if not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户名或密码错误"
         )
+    if new_hash:
+        # 哈希成本参数已变更，用新参数重新保存
+        await run_in_threadpool(update_password_hash, db, user, new_hash)
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
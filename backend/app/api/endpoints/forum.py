@@ -1,7 +1,11 @@
-from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from backend.app.api import deps
+from backend.app.core.config import settings
+from backend.app.core.responses import FastJSONResponse
+from backend.app.db.pagination import InvalidCursorError
 from backend.app.services import forum as forum_service
 from backend.app.schemas.forum import Post, PostCreate, PostUpdate, Comment, CommentCreate, PostWithComments
 from backend.app.schemas.user import User
@@ -9,16 +13,36 @@ from backend.app.schemas.user import User
 router = APIRouter()
 
 @router.get("/posts", response_model=List[Post])
-def get_posts(
-    db: Session = Depends(deps.get_db),
+async def get_posts(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
     skip: int = 0,
     limit: int = 100,
-    current_user = Depends(deps.get_current_user)
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor"),
+    current_user = Depends(deps.get_current_user_async)
 ):
     """
     获取所有帖子
-    """
-    return forum_service.get_posts(db, skip=skip, limit=limit)
+    
+    首页或携带 cursor 时使用游标分页，下一页游标通过响应头 X-Next-Cursor 返回
+    """
+    if settings.FAST_JSON_RESPONSES:
+        try:
+            items, next_cursor = await forum_service.get_post_rows_async(db, skip=skip, limit=limit, cursor=cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return FastJSONResponse(items, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+    
+    if cursor or skip == 0:
+        try:
+            posts, next_cursor = await forum_service.get_posts_by_cursor_async(db, cursor=cursor, limit=limit)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return posts
+    
+    return await forum_service.get_posts_async(db, skip=skip, limit=limit)
 
 @router.post("/posts", response_model=Post)
 def create_post(
@@ -33,15 +57,22 @@ def create_post(
     return forum_service.create_post(db, post_in, current_user.id)
 
 @router.get("/posts/{post_id}", response_model=PostWithComments)
-def get_post(
+async def get_post(
     post_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    comment_limit: Optional[int] = Query(None, ge=1, le=200, description="每页顶级评论数，为空时返回全部评论"),
+    comment_cursor: Optional[str] = Query(None, description="评论分页游标，取自上一页响应的 comments_next_cursor"),
+    current_user = Depends(deps.get_current_user_async)
 ):
     """
     获取特定帖子及其评论
+    
+    comments 为按时间排序的顶级评论，回复嵌套在 replies 中；指定 comment_limit 时分页返回。
     """
-    post = forum_service.get_post(db, post_id)
+    try:
+        post, next_cursor = await forum_service.get_post_async(db, post_id, comment_cursor, comment_limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not post:
         raise HTTPException(
             status_code=404,
@@ -49,9 +80,11 @@ def get_post(
         )
     
     # 增加浏览次数
-    forum_service.increment_post_view(db, post_id)
+    await forum_service.increment_post_view_async(db, post)
     
-    return post
+    result = PostWithComments.model_validate(post)
+    result.comments_next_cursor = next_cursor
+    return result
 
 @router.put("/posts/{post_id}", response_model=Post)
 def update_post(
@@ -113,14 +146,12 @@ def like_post(
     """
     点赞帖子
     """
-    post = forum_service.get_post(db, post_id)
-    if not post:
+    if not forum_service.like_post(db, post_id):
         raise HTTPException(
             status_code=404,
             detail="帖子不存在"
         )
     
-    forum_service.like_post(db, post_id)
     return {"status": "success"}
 
 @router.post("/comments", response_model=Comment)
@@ -133,24 +164,28 @@ def create_comment(
     """
     创建评论
     """
-    # 检查帖子是否存在
-    post = forum_service.get_post(db, comment_in.post_id)
-    if not post:
-        raise HTTPException(
-            status_code=404,
-            detail="帖子不存在"
-        )
-    
     # 如果有父评论，检查父评论是否存在
     if comment_in.parent_id:
-        parent_comment = db.query(Comment).filter(Comment.id == comment_in.parent_id).first()
+        parent_comment = forum_service.get_comment(db, comment_in.parent_id)
         if not parent_comment:
             raise HTTPException(
                 status_code=404,
                 detail="父评论不存在"
             )
+        if parent_comment.post_id != comment_in.post_id:
+            raise HTTPException(
+                status_code=400,
+                detail="父评论不属于该帖子"
+            )
     
-    return forum_service.create_comment(db, comment_in, current_user.id)
+    # 帖子是否存在由评论计数的更新语句判断
+    comment = forum_service.create_comment(db, comment_in, current_user.id)
+    if not comment:
+        raise HTTPException(
+            status_code=404,
+            detail="帖子不存在"
+        )
+    return comment
 
 @router.delete("/comments/{comment_id}")
 def delete_comment(
@@ -161,7 +196,7 @@ def delete_comment(
     """
     删除评论
     """
-    comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    comment = forum_service.get_comment(db, comment_id)
     if not comment:
         raise HTTPException(
             status_code=404,
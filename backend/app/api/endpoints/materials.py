@@ -1,39 +1,75 @@
 from typing import List, Optional, Any
 import os
 import shutil
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from backend.app.api import deps
+from backend.app.core.previews import derivative_version, has_derivatives
+from backend.app.core.responses import FastJSONResponse, file_response
+from backend.app.db.pagination import InvalidCursorError
 from backend.app.services import materials as materials_service
-from backend.app.schemas.material import Material, MaterialCreate, MaterialUpdate, MaterialWithDetails
+from backend.app.services import storage
+from backend.app.services import upload_sessions
+from backend.app.services.derivatives import derivative_generator
+from backend.app.schemas.material import (
+    Material, MaterialCreate, MaterialUpdate, MaterialWithDetails,
+    UploadSession, UploadSessionCreate, UploadSessionPart, UploadSessionComplete
+)
 from backend.app.core.config import settings
 from backend.app.schemas.user import User
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Material])
-def get_materials(
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+async def get_materials(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user_async),
     skip: int = 0,
     limit: int = 100,
-    is_public: Optional[bool] = None
+    is_public: Optional[bool] = None,
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor")
 ):
     """
     获取资料列表
+    
+    首页或携带 cursor 时使用游标分页，下一页游标通过响应头 X-Next-Cursor 返回；
+    skip 仅为兼容旧客户端保留。
     """
-    return materials_service.get_materials(db, current_user.id, skip, limit, is_public)
+    if settings.FAST_JSON_RESPONSES:
+        try:
+            items, next_cursor = await materials_service.get_material_rows_async(
+                db, current_user.id, skip, limit, is_public, cursor
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return FastJSONResponse(items, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+    
+    if cursor or skip == 0:
+        try:
+            items, next_cursor = await materials_service.get_materials_by_cursor_async(
+                db, current_user.id, cursor, limit, is_public
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return items
+    
+    return await materials_service.get_materials_async(db, current_user.id, skip, limit, is_public)
 
 @router.get("/{material_id}", response_model=MaterialWithDetails)
-def get_material(
+async def get_material(
     material_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user_async)
 ):
     """
     获取资料详情
     """
-    material = materials_service.get_material(db, material_id)
+    material = await materials_service.get_material_async(db, material_id)
     if not material:
         raise HTTPException(status_code=404, detail="资料不存在")
     
@@ -42,10 +78,111 @@ def get_material(
         raise HTTPException(status_code=403, detail="无权访问此资料")
     
     # 增加浏览次数
-    materials_service.increment_view_count(db, material)
+    await materials_service.increment_view_count_async(db, material)
     
     return material
 
+@router.api_route("/{material_id}/download", methods=["GET", "HEAD"])
+def download_material(
+    material_id: int,
+    request: Request,
+    inline: bool = Query(False, description="在浏览器中直接打开（视频/音频播放）而不是下载"),
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    下载资料文件
+    
+    支持 Range 请求（视频拖动进度、断点续传）以及 If-None-Match / If-Modified-Since
+    条件请求；ETag 为文件内容的 SHA-256。
+    """
+    material = materials_service.get_material(db, material_id)
+    if not material:
+        raise HTTPException(status_code=404, detail="资料不存在")
+    
+    # 权限检查：与获取资料详情相同
+    if material.owner_id != current_user.id and not material.is_public:
+        raise HTTPException(status_code=403, detail="无权访问此资料")
+    
+    if not material.file_path or not os.path.isfile(material.file_path):
+        raise HTTPException(status_code=404, detail="资料文件不存在")
+    
+    return file_response(
+        request,
+        material.file_path,
+        etag=f'"{material.file_hash}"' if material.file_hash else None,
+        filename=material.file_name or os.path.basename(material.file_path),
+        content_disposition_type="inline" if inline else "attachment",
+        accel_redirect=_accel_redirect_path(material.file_path)
+    )
+
+@router.get("/{material_id}/thumbnail")
+async def get_material_thumbnail(
+    material_id: int,
+    request: Request,
+    v: Optional[str] = Query(None, description="缓存版本号，取自资料的 thumbnail_url"),
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    获取资料缩略图
+    """
+    return await _derivative_response(db, request, material_id, "thumbnail", v, current_user)
+
+@router.get("/{material_id}/preview")
+async def get_material_preview(
+    material_id: int,
+    request: Request,
+    v: Optional[str] = Query(None, description="缓存版本号，取自资料的 preview_url"),
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    获取资料预览图
+    """
+    return await _derivative_response(db, request, material_id, "preview", v, current_user)
+
+async def _derivative_response(db: Session, request: Request, material_id: int, kind: str,
+                               version: Optional[str], current_user: User):
+    material = await run_in_threadpool(materials_service.get_material, db, material_id)
+    if not material:
+        raise HTTPException(status_code=404, detail="资料不存在")
+    
+    if material.owner_id != current_user.id and not material.is_public:
+        raise HTTPException(status_code=403, detail="无权访问此资料")
+    
+    if not has_derivatives(material):
+        raise HTTPException(status_code=404, detail="该资料没有缩略图")
+    
+    # 缩略图缺失时（尚未生成或已被清理）在此生成
+    path = await derivative_generator.ensure(material, kind)
+    if path is None:
+        raise HTTPException(status_code=404, detail="无法生成缩略图")
+    
+    current_version = derivative_version(material)
+    # 地址中的版本号与当前一致时可长期缓存，文件变化后地址随之变化
+    cache_control = "private, max-age=31536000, immutable" if version == current_version else "private, no-cache"
+    return file_response(
+        request,
+        path,
+        etag=f'"{current_version}-{kind}"',
+        media_type="image/jpeg",
+        content_disposition_type="inline",
+        cache_control=cache_control
+    )
+
+def _accel_redirect_path(file_path: str) -> Optional[str]:
+    """
+    配置了 DOWNLOAD_ACCEL_REDIRECT_PREFIX 时，返回文件对应的 nginx 内部路径
+    """
+    prefix = settings.DOWNLOAD_ACCEL_REDIRECT_PREFIX
+    if not prefix:
+        return None
+    relative = os.path.relpath(os.path.realpath(file_path), os.path.realpath(settings.UPLOAD_DIR))
+    if relative.startswith(os.pardir):
+        return None
+    return prefix.rstrip("/") + "/" + relative.replace(os.sep, "/")
+
 @router.post("/upload", response_model=Material)
 async def upload_material(
     file: UploadFile = File(...),
@@ -54,32 +191,38 @@ async def upload_material(
     tags: Optional[str] = Form(None),  # 逗号分隔的标签ID
     mindmap_id: Optional[int] = Form(None),
     is_public: bool = Form(False),
+    sha256: Optional[str] = Form(None),  # 客户端预先计算的文件哈希（可选）
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user)
 ):
     """
     上传资料文件
-    """
-    # 检查文件大小
-    file_size = 0
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    if file_size > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(status_code=400, detail=f"文件大小超过限制（{settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB）")
     
+    文件按内容（SHA-256）去重存储；客户端提供 sha256 且该文件已存在时，
+    只校验哈希而不写磁盘。
+    """
     # 获取文件类型
-    file_extension = os.path.splitext(file.filename)[1].lower()
+    filename = os.path.basename(file.filename)
+    file_extension = os.path.splitext(filename)[1].lower()
     file_type = _get_file_type(file_extension)
     
-    # 创建上传目录
-    upload_dir = os.path.join(settings.UPLOAD_DIR, str(current_user.id))
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # 保存文件
-    file_path = os.path.join(upload_dir, file.filename)
-    with open(file_path, "wb") as buffer:
-        buffer.write(file_content)
+    try:
+        file_hash = None
+        source_path = None
+        # 快速路径：文件已存在时只计算哈希校验，不写磁盘
+        if sha256 and await run_in_threadpool(storage.blob_exists, db, sha256.lower()):
+            file_size, file_hash = await storage.hash_upload(file, settings.MAX_UPLOAD_SIZE)
+            if file_hash != sha256.lower():
+                file_hash = None
+                await file.seek(0)
+        
+        # 按块写入临时文件，边写边检查大小并计算哈希，创建资料时再放入内容寻址存储
+        if file_hash is None:
+            source_path = storage.temp_path()
+            file_size, file_hash = await storage.save_upload(file, source_path, settings.MAX_UPLOAD_SIZE)
+    except storage.UploadTooLargeError:
+        raise HTTPException(status_code=413, detail=f"文件大小超过限制（{settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB）")
+    file_path = storage.blob_path(file_hash)
     
     # 处理标签
     tag_ids = []
@@ -96,7 +239,156 @@ async def upload_material(
         is_public=is_public
     )
     
-    return materials_service.create_material(db, material_in, current_user.id, file_path)
+    def create(source_path: Optional[str]):
+        return materials_service.create_material(
+            db, material_in, current_user.id, file_path,
+            file_size=file_size, file_hash=file_hash, file_name=filename, source_path=source_path
+        )
+    
+    try:
+        try:
+            return await run_in_threadpool(create, source_path)
+        except storage.BlobMissingError:
+            # 快速路径校验后、取得引用前文件被删除：重新读取上传内容写入存储
+            await file.seek(0)
+            source_path = storage.temp_path()
+            await storage.save_upload(file, source_path, settings.MAX_UPLOAD_SIZE)
+            return await run_in_threadpool(create, source_path)
+    finally:
+        if source_path:
+            await run_in_threadpool(_remove_if_exists, source_path)
+
+@router.post("/uploads", response_model=UploadSession)
+def create_upload_session(
+    session_in: UploadSessionCreate,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    创建分片上传会话（用于大文件断点续传）
+    
+    之后按编号上传分片（可并行），全部上传后调用 complete 创建资料；
+    中断后可通过 GET 查询已上传的分片，只补传缺失部分。
+    """
+    try:
+        session = upload_sessions.create_session(
+            db, current_user.id, session_in.file_name, session_in.file_size
+        )
+    except upload_sessions.UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _upload_session_out(session)
+
+@router.get("/uploads/{session_id}", response_model=UploadSession)
+def get_upload_session(
+    session_id: str,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    获取上传会话及已上传的分片
+    """
+    session = _get_own_upload_session(db, session_id, current_user)
+    return _upload_session_out(session)
+
+@router.put("/uploads/{session_id}/parts/{part_number}", response_model=UploadSessionPart)
+async def upload_part(
+    session_id: str,
+    part_number: int,
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    上传一个分片，请求体为分片的原始字节
+    
+    请求体按块异步写入；同步的数据库和文件系统操作在线程池中执行
+    """
+    session = await run_in_threadpool(_get_own_upload_session, db, session_id, current_user)
+    try:
+        size = await upload_sessions.save_part(db, session, part_number, request.stream())
+    except upload_sessions.UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return UploadSessionPart(part_number=part_number, size=size)
+
+@router.post("/uploads/{session_id}/complete", response_model=Material)
+async def complete_upload_session(
+    session_id: str,
+    material_in: UploadSessionComplete,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    拼接分片并创建资料
+    """
+    session = await run_in_threadpool(_get_own_upload_session, db, session_id, current_user)
+    try:
+        temp_path, file_size, file_hash = await run_in_threadpool(upload_sessions.assemble_parts, session)
+    except upload_sessions.UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if material_in.sha256 and material_in.sha256.lower() != file_hash:
+        await run_in_threadpool(os.remove, temp_path)
+        raise HTTPException(status_code=400, detail="文件哈希校验失败")
+    
+    file_name = session.file_name
+    try:
+        material = await run_in_threadpool(
+            materials_service.create_material,
+            db,
+            MaterialCreate(
+                title=material_in.title,
+                description=material_in.description,
+                file_type=_get_file_type(os.path.splitext(file_name)[1].lower()),
+                tags=material_in.tags,
+                mindmap_id=material_in.mindmap_id,
+                is_public=material_in.is_public
+            ),
+            current_user.id,
+            storage.blob_path(file_hash),
+            file_size=file_size,
+            file_hash=file_hash,
+            file_name=file_name,
+            source_path=temp_path
+        )
+    finally:
+        await run_in_threadpool(_remove_if_exists, temp_path)
+    await run_in_threadpool(upload_sessions.delete_session, db, session)
+    return material
+
+@router.delete("/uploads/{session_id}")
+def abort_upload_session(
+    session_id: str,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    取消上传会话并删除已上传的分片
+    """
+    session = _get_own_upload_session(db, session_id, current_user)
+    upload_sessions.delete_session(db, session)
+    return {"status": "success"}
+
+def _remove_if_exists(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+def _get_own_upload_session(db: Session, session_id: str, current_user: User):
+    session = upload_sessions.get_session(db, session_id)
+    if not session or session.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="上传会话不存在或已过期")
+    return session
+
+def _upload_session_out(session) -> UploadSession:
+    return UploadSession(
+        id=session.id,
+        file_name=session.file_name,
+        file_size=session.file_size,
+        expires_at=session.expires_at,
+        part_size_limit=settings.UPLOAD_PART_MAX_SIZE,
+        parts=[
+            UploadSessionPart(part_number=number, size=size)
+            for number, size in upload_sessions.list_parts(session.id)
+        ]
+    )
 
 @router.put("/{material_id}", response_model=Material)
 def update_material(
@@ -136,10 +428,6 @@ def delete_material(
     # 删除资料及其关联文件
     materials_service.delete_material(db, material_id)
     
-    # 如果有关联文件，删除文件
-    if material.file_path and os.path.exists(material.file_path):
-        os.remove(material.file_path)
-    
     return {"status": "success"}
 
 @router.get("/by-tags", response_model=List[Material])
@@ -168,16 +456,13 @@ def like_material(
     """
     点赞资料
     """
-    material = materials_service.get_material(db, material_id)
-    if not material:
-        raise HTTPException(status_code=404, detail="资料不存在")
-    
-    # 只有公开资料或用户自己的资料可以点赞
-    if material.owner_id != current_user.id and not material.is_public:
+    # 只有公开资料或用户自己的资料可以点赞，条件在计数更新语句中判断，
+    # 只有更新失败时才查询资料以区分不存在和无权访问
+    if not materials_service.like_material(db, material_id, current_user.id):
+        if not materials_service.get_material(db, material_id):
+            raise HTTPException(status_code=404, detail="资料不存在")
         raise HTTPException(status_code=403, detail="无权访问此资料")
     
-    materials_service.increment_like_count(db, material)
-    
     return {"status": "success"}
 
 def _get_file_type(extension: str) -> str:
@@ -1,7 +1,8 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from backend.app.api import deps
+from backend.app.db.pagination import InvalidCursorError
 from backend.app.services import mindmap as mindmap_service
 from backend.app.schemas.mindmap import MindMap, MindMapCreate, MindMapUpdate, MindMapWithDetails
 from backend.app.schemas.tag import Tag, TagCreate
@@ -10,12 +11,24 @@ router = APIRouter()
 
 @router.get("/", response_model=List[MindMap])
 def get_mindmaps(
+    response: Response,
     db: Session = Depends(deps.get_db),
     current_user = Depends(deps.get_current_user),
     skip: int = 0, 
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor")
 ):
-    """获取用户的所有思维导图"""
+    """获取用户的所有思维导图（首页或携带 cursor 时使用游标分页）"""
+    if cursor or skip == 0:
+        try:
+            mindmaps, next_cursor = mindmap_service.get_user_mindmaps_by_cursor(
+                db, current_user.id, cursor=cursor, limit=limit
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return mindmaps
     return mindmap_service.get_user_mindmaps(db, current_user.id, skip=skip, limit=limit)
 
 @router.get("/{mindmap_id}", response_model=MindMapWithDetails)
@@ -1,10 +1,12 @@
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 
 from backend.app.api import deps
+from backend.app.db.pagination import InvalidCursorError
 from backend.app.models.user import User
 from backend.app.models.mindmap import MindMap
+from backend.app.services import mindmap as mindmap_service
 from backend.app.schemas.mindmap import MindMapCreate, MindMapUpdate, MindMapResponse
 
 router = APIRouter()
@@ -32,18 +34,30 @@ def create_mindmap(
 
 @router.get("/", response_model=List[MindMapResponse])
 def get_mindmaps(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor"),
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
     """
     获取当前用户的所有思维导图
+    
+    首页或携带 cursor 时使用游标分页，下一页游标通过响应头 X-Next-Cursor 返回
     """
-    mindmaps = db.query(MindMap).filter(
-        MindMap.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    return mindmaps
+    if cursor or skip == 0:
+        try:
+            mindmaps, next_cursor = mindmap_service.get_user_mindmaps_by_cursor(
+                db, current_user.id, cursor=cursor, limit=limit
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return mindmaps
+    
+    return mindmap_service.get_user_mindmaps(db, current_user.id, skip=skip, limit=limit)
 
 @router.get("/{mindmap_id}", response_model=MindMapResponse)
 def get_mindmap(
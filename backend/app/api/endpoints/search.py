@@ -1,7 +1,12 @@
 from typing import List, Optional, Any
 from fastapi import APIRouter, Depends, Query, HTTPException, Body
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from backend.app.api import deps
+from backend.app.core.config import settings
+from backend.app.core.responses import FastJSONResponse
+from backend.app.db.pagination import InvalidCursorError
+from backend.app.services import projections
 from backend.app.services import search as search_service
 from backend.app.schemas.search import (
     SearchQuery, 
@@ -23,12 +28,19 @@ def search_by_keyword(
     sort_by: str = Query("relevance", description="排序方式"),
     page: int = Query(1, description="页码"),
     limit: int = Query(10, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页结果的 next_cursor"),
+    count: str = Query("auto", description="总数统计方式：auto / exact / none"),
     db: Session = Depends(deps.get_db),
     current_user = Depends(deps.get_current_user)
 ):
     """
     关键词搜索API
+    
+    同步接口（在线程池中执行）：倒排索引打分逐行在 Python 中计算，放在事件循环上会阻塞其他请求
     """
+    if count not in search_service.COUNT_MODES:
+        raise HTTPException(status_code=400, detail="不支持的总数统计方式")
+    
     filters = {
         "file_type": file_type,
         "tags": tags,
@@ -36,20 +48,32 @@ def search_by_keyword(
         "date_to": date_to
     }
     
-    result = search_service.search_by_keyword(
-        db, 
-        current_user.id, 
-        query, 
-        filters, 
-        sort_by, 
-        page, 
-        limit
-    )
+    try:
+        result = search_service.search_by_keyword(
+            db, 
+            current_user.id, 
+            query, 
+            filters, 
+            sort_by, 
+            page, 
+            limit,
+            cursor,
+            count,
+            projections.MATERIAL_COLUMNS if settings.FAST_JSON_RESPONSES else None
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # 先生成响应再记录搜索历史：提交会使会话中的资料对象过期，合并的待写计数随之丢失
+    if settings.FAST_JSON_RESPONSES:
+        result["items"] = projections.material_dicts(result["items"])
+        response = FastJSONResponse(result)
+    else:
+        response = KeywordSearchResult.model_validate(result)
     
     # 记录搜索历史
     search_service.add_search_history(db, current_user.id, query, "keyword")
-    
-    return result
+    return response
 
 @router.get("/mindmap", response_model=MindMapSearchResult)
 def search_by_mindmap(
@@ -94,15 +118,15 @@ def search_by_mindmap(
     return result
 
 @router.get("/history", response_model=List[SearchHistoryItem])
-def get_search_history(
+async def get_search_history(
     limit: int = Query(10, description="历史记录数量"),
-    db: Session = Depends(deps.get_db),
-    current_user = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user = Depends(deps.get_current_user_async)
 ):
     """
     获取用户搜索历史
     """
-    return search_service.get_user_search_history(db, current_user.id, limit)
+    return await search_service.get_user_search_history_async(db, current_user.id, limit)
 
 @router.delete("/history")
 def clear_search_history(
@@ -0,0 +1,24 @@
+from typing import Any, Dict
+from fastapi import APIRouter, Depends
+from backend.app.api import deps
+from backend.app.core.security import password_hasher
+from backend.app.db.session import async_pool_metrics, pool_metrics, replica_router
+from backend.app.schemas.user import User
+
+router = APIRouter()
+
+@router.get("/metrics")
+def get_metrics(
+    current_user: User = Depends(deps.get_current_admin)
+) -> Dict[str, Any]:
+    """
+    运行指标（仅管理员）
+    """
+    return {
+        "password_hasher": password_hasher.metrics(),
+        "database_pool": {
+            "sync": pool_metrics.snapshot(),
+            "async": async_pool_metrics.snapshot(),
+        },
+        "replicas": replica_router.metrics() if replica_router is not None else None,
+    }
@@ -29,7 +29,8 @@ def update_user_me(
     """
     更新当前用户信息
     """
-    user = user_service.update_user(db, current_user, user_in)
+    user = user_service.get_user_by_id(db, current_user.id)
+    user = user_service.update_user(db, user, user_in)
     return user
 
 @router.post("/avatar", response_model=User)
@@ -67,7 +68,8 @@ async def upload_avatar(
     # 更新用户头像URL
     avatar_url = f"/uploads/avatars/{avatar_filename}"
     user_in = UserUpdate(avatar_url=avatar_url)
-    user = user_service.update_user(db, current_user, user_in)
+    user = user_service.get_user_by_id(db, current_user.id)
+    user = user_service.update_user(db, user, user_in)
     
     return user
 
@@ -121,6 +123,40 @@ def read_user(
         )
     return user
 
+@router.post("/{user_id}/deactivate", response_model=User)
+def deactivate_user(
+    user_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user = Depends(deps.get_current_admin),
+):
+    """
+    停用用户（仅管理员），该用户已登录的令牌立即失效
+    """
+    user = user_service.get_user_by_id(db, user_id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail="用户不存在",
+        )
+    return user_service.set_user_active(db, user, False)
+
+@router.post("/{user_id}/activate", response_model=User)
+def activate_user(
+    user_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user = Depends(deps.get_current_admin),
+):
+    """
+    重新激活用户（仅管理员）
+    """
+    user = user_service.get_user_by_id(db, user_id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail="用户不存在",
+        )
+    return user_service.set_user_active(db, user, True)
+
 @router.delete("/{user_id}")
 def delete_user(
     user_id: int,
@@ -1,7 +1,18 @@
+import asyncio
 import logging
 from typing import Callable
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from backend.app.core.config import settings
+from backend.app.core.security import password_hasher
+from backend.app.core.static_pages import static_pages
 from backend.app.db.init_db import init_db
+from backend.app.db.session import SessionLocal, async_engine, replica_router
+from backend.app.services.counters import counter_buffer
+from backend.app.services.derivatives import derivative_generator
+from backend.app.services.extraction import extraction_queue
+from backend.app.services.forum import reconcile_comment_counts
+from backend.app.services.upload_sessions import cleanup_stale_sessions
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +24,15 @@ def create_start_app_handler(app: FastAPI) -> Callable:
         logger.info("正在初始化数据库...")
         init_db()
         logger.info("数据库初始化完成！")
+        await static_pages.load()
+        counter_buffer.start()
+        extraction_queue.start()
+        derivative_generator.start()
+        app.state.upload_gc_task = asyncio.create_task(_collect_upload_sessions())
+        if settings.COMMENT_COUNT_RECONCILE_INTERVAL > 0:
+            app.state.comment_count_task = asyncio.create_task(_reconcile_comment_counts())
+        if replica_router is not None:
+            app.state.replica_check_task = asyncio.create_task(_check_replicas())
 
     return start_app
 
@@ -22,5 +42,57 @@ def create_stop_app_handler(app: FastAPI) -> Callable:
     """
     async def stop_app() -> None:
         logger.info("应用程序关闭...")
+        for name in ("upload_gc_task", "comment_count_task", "replica_check_task"):
+            task = getattr(app.state, name, None)
+            if task is not None:
+                task.cancel()
+        extraction_queue.stop()
+        derivative_generator.stop()
+        counter_buffer.stop()
+        password_hasher.shutdown()
+        await async_engine.dispose()
+        if replica_router is not None:
+            await replica_router.dispose()
 
-    return stop_app 
\ No newline at end of file
+    return stop_app 
+
+async def _collect_upload_sessions() -> None:
+    """
+    定期清理过期的分片上传会话
+    """
+    while True:
+        db = SessionLocal()
+        try:
+            await run_in_threadpool(cleanup_stale_sessions, db)
+        except Exception:
+            logger.exception("清理过期上传会话失败")
+        finally:
+            db.close()
+        await asyncio.sleep(settings.UPLOAD_SESSION_GC_INTERVAL)
+
+async def _reconcile_comment_counts() -> None:
+    """
+    定期校正帖子评论计数（启动后等待一个间隔再执行，避免每次启动都全表扫描）
+    """
+    while True:
+        await asyncio.sleep(settings.COMMENT_COUNT_RECONCILE_INTERVAL)
+        db = SessionLocal()
+        try:
+            fixed = await run_in_threadpool(reconcile_comment_counts, db)
+            if fixed:
+                logger.warning("已校正 %d 个帖子的评论计数", fixed)
+        except Exception:
+            logger.exception("校正帖子评论计数失败")
+        finally:
+            db.close()
+
+async def _check_replicas() -> None:
+    """
+    定期检测只读副本的复制延迟
+    """
+    while True:
+        try:
+            await run_in_threadpool(replica_router.check)
+        except Exception:
+            logger.exception("检测只读副本失败")
+        await asyncio.sleep(settings.REPLICA_LAG_CHECK_INTERVAL)
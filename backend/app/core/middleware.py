@@ -0,0 +1,146 @@
+import json
+import time
+import logging
+from typing import Iterable
+
+from backend.app.db import query_stats
+
+logger = logging.getLogger(__name__)
+
+# multipart 表单中除文件内容外的其他字段和边界所允许的额外字节数
+MULTIPART_OVERHEAD = 1024 * 1024
+
+class UploadSizeLimitMiddleware:
+    """
+    限制上传请求体大小的 ASGI 中间件
+
+    在表单解析之前检查 Content-Length，并在读取请求体时累计字节数，
+    超过限制立即停止接收并返回 413，不必等整个请求体落盘后再判断。
+    """
+
+    def __init__(self, app, max_size: int, paths: Iterable[str]):
+        self.app = app
+        self.max_body_size = max_size + MULTIPART_OVERHEAD
+        # 精确匹配路径（忽略末尾的 /），/materials/upload 不应匹配 /materials/uploads/...
+        self.paths = frozenset(path.rstrip("/") for path in paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT") \
+                or scope["path"].rstrip("/") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() \
+                and int(content_length) > self.max_body_size:
+            await self._send_too_large(send)
+            return
+
+        received = 0
+        exceeded = False
+        responded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    exceeded = True
+                    raise RuntimeError("请求体超过大小限制")
+            return message
+
+        async def guarded_send(message):
+            nonlocal responded
+            # 超限后表单解析失败产生的响应替换为 413
+            if exceeded:
+                if message["type"] == "http.response.start" and not responded:
+                    responded = True
+                    await self._send_too_large(send)
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except RuntimeError:
+            if not exceeded:
+                raise
+            if not responded:
+                await self._send_too_large(send)
+
+    async def _send_too_large(self, send):
+        body = json.dumps({"detail": "文件大小超过限制"}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+class QueryStatsMiddleware:
+    """
+    统计每个请求执行的 SQL 的 ASGI 中间件
+
+    记录语句数、数据库总耗时和重复执行的语句形状，通过 Server-Timing 响应头返回，
+    并写入结构化日志；同一查询在一个请求内执行次数达到 n_plus_one_threshold 时
+    视为疑似 N+1，以 WARNING 级别记录。
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = 10, server_timing: bool = True):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.server_timing = server_timing
+        query_stats.install()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = query_stats.start()
+        stats = query_stats.current()
+        started = time.perf_counter()
+        status_code = None
+
+        async def timed_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", self._server_timing(stats).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            query_stats.stop(token)
+            self._log(scope, status_code, stats, time.perf_counter() - started)
+
+    def _server_timing(self, stats: query_stats.QueryStats) -> str:
+        suspects = len(stats.repeated(self.n_plus_one_threshold))
+        description = f"{stats.count} queries" + (f", {suspects} repeated" if suspects else "")
+        return f'db;dur={stats.duration * 1000:.1f};desc="{description}"'
+
+    def _log(self, scope, status_code, stats: query_stats.QueryStats, duration: float) -> None:
+        repeated = stats.repeated(self.n_plus_one_threshold)
+        level = logging.WARNING if repeated else logging.DEBUG
+        if not logger.isEnabledFor(level):
+            return
+        record = {
+            "event": "request_queries",
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "status": status_code,
+            "queries": stats.count,
+            "db_ms": round(stats.duration * 1000, 2),
+            "duration_ms": round(duration * 1000, 2),
+        }
+        if repeated:
+            record["n_plus_one"] = repeated
+        logger.log(level, json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,32 @@
+"""
+缩略图/预览图支持的文件类型和缓存版本号
+
+只依赖标准库：缩略图进程池的子进程（services/imaging.py）、响应模型和列表快速序列化共用，
+不要在这里导入数据库、应用配置或服务层的模块。
+"""
+import os
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+OFFICE_EXTENSIONS = {".docx", ".pptx", ".xlsx"}
+PDF_EXTENSIONS = {".pdf"}
+
+def supports_preview(extension: str) -> bool:
+    extension = extension.lower()
+    return extension in IMAGE_EXTENSIONS or extension in OFFICE_EXTENSIONS or extension in PDF_EXTENSIONS
+
+def file_extension(material) -> str:
+    """
+    资料文件的扩展名（material 为资料对象或包含文件信息列的查询结果行，下同）
+    """
+    return os.path.splitext(material.file_name or material.file_path or "")[1].lower()
+
+def has_derivatives(material) -> bool:
+    return bool(material.file_path) and supports_preview(file_extension(material))
+
+def derivative_version(material) -> str:
+    """
+    缓存版本号：文件内容（或旧文件的更新时间）变化时随之变化
+    """
+    if material.file_hash:
+        return material.file_hash[:16]
+    return str(int(material.updated_at.timestamp())) if material.updated_at else "0"
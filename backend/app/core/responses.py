@@ -0,0 +1,234 @@
+import os
+import re
+import json
+from datetime import date, datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Optional, Tuple
+
+import anyio
+from fastapi import Request
+from starlette.responses import FileResponse, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 未安装 orjson 时使用标准库编码
+    orjson = None
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+class RangeNotSatisfiable(Exception):
+    """Range 请求头超出文件范围"""
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单个字节区间的 Range 请求头，返回 [start, end]（闭区间）
+
+    无法识别的格式和多区间请求返回 None（按规范忽略 Range，返回完整文件），
+    区间完全超出文件范围时抛出 RangeNotSatisfiable。
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    start, end = match.groups()
+    if start == "":
+        # bytes=-N 表示最后 N 个字节
+        length = int(end)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = size - 1 if end == "" else min(int(end), size - 1)
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """
+    根据 If-None-Match / If-Modified-Since 判断客户端缓存是否仍然有效
+
+    同时提供两者时以 If-None-Match 为准。
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [_strip_weak(tag.strip()) for tag in if_none_match.split(",")]
+        # 弱比较：忽略 W/ 前缀
+        return "*" in tags or _strip_weak(etag) in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+def _strip_weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+def _if_range_matches(request: Request, etag: str, last_modified: str) -> bool:
+    """
+    If-Range 与当前版本不一致时忽略 Range，返回完整文件
+    """
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith(("\"", "W/")):
+        # If-Range 要求强比较，弱 ETag 永远不匹配
+        return not etag.startswith("W/") and if_range == etag
+    return if_range == last_modified
+
+class FileRangeResponse(FileResponse):
+    """
+    支持单区间 Range 请求的文件响应
+
+    服务器支持 ASGI zero-copy 扩展时把文件描述符交给服务器用 sendfile 发送；
+    支持 pathsend 扩展且发送完整文件时直接交出路径；否则在线程中按块读取发送。
+    """
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        byte_range: Optional[Tuple[int, int]] = None,
+        **kwargs
+    ) -> None:
+        super().__init__(path, stat_result=stat_result, **kwargs)
+        self.headers["accept-ranges"] = "bytes"
+        size = stat_result.st_size
+        if byte_range is None:
+            self.offset, self.count = 0, size
+        else:
+            start, end = byte_range
+            self.status_code = 206
+            self.offset, self.count = start, end - start + 1
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(self.count)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        extensions = scope.get("extensions") or {}
+        if scope["method"].upper() == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+        elif "http.response.pathsend" in extensions and self.status_code == 200:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            await self._send_chunks(send)
+        if self.background is not None:
+            await self.background()
+
+    async def _send_chunks(self, send) -> None:
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            position, remaining = self.offset, self.count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(
+                    os.pread, fd, min(self.chunk_size, remaining), position
+                )
+                if not chunk:
+                    break
+                position += len(chunk)
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                # 文件在发送过程中被截断
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
+
+def file_response(
+    request: Request,
+    path: str,
+    etag: Optional[str] = None,
+    media_type: Optional[str] = None,
+    filename: Optional[str] = None,
+    content_disposition_type: str = "attachment",
+    accel_redirect: Optional[str] = None,
+    cache_control: str = "private, no-cache",
+) -> Response:
+    """
+    返回文件内容，处理条件请求（304）和 Range 请求（206/416）
+
+    未提供 etag 时根据文件修改时间和大小生成弱 ETag。
+
+    提供 accel_redirect 时只返回 X-Accel-Redirect 头，由前置的 nginx
+    从内部路径直接发送文件（Range 和条件请求同样由 nginx 处理）。
+    """
+    stat_result = os.stat(path)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    if etag is None:
+        etag = f'W/"{int(stat_result.st_mtime)}-{stat_result.st_size}"'
+    headers = {"etag": etag, "last-modified": last_modified, "cache-control": cache_control}
+
+    if is_not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if accel_redirect is not None:
+        response = FileResponse(
+            path, stat_result=stat_result, headers=headers, media_type=media_type,
+            filename=filename, content_disposition_type=content_disposition_type
+        )
+        del response.headers["content-length"]
+        response.headers["x-accel-redirect"] = accel_redirect
+        return Response(status_code=200, headers=dict(response.headers))
+
+    byte_range = None
+    if _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get("range"), stat_result.st_size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=416,
+                headers={**headers, "content-range": f"bytes */{stat_result.st_size}"}
+            )
+
+    return FileRangeResponse(
+        path,
+        stat_result=stat_result,
+        byte_range=byte_range,
+        headers=headers,
+        media_type=media_type,
+        filename=filename,
+        content_disposition_type=content_disposition_type,
+    )
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"无法编码为 JSON 的类型: {type(value).__name__}")
+
+class FastJSONResponse(Response):
+    """
+    直接编码字典/列表的 JSON 响应，不经过 response_model 校验
+
+    内容须已与响应模型的结构一致（见 services/projections.py）；优先使用 orjson 编码，
+    时间格式与 pydantic 的 JSON 输出相同。
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(
+            content, ensure_ascii=False, separators=(",", ":"), default=_json_default
+        ).encode("utf-8")
@@ -1,11 +1,110 @@
-from typing import Optional
+import time
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from jose import jwt
 from passlib.context import CryptContext
 from backend.app.core.config import settings
 
-# 密码哈希上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 密码哈希上下文；成本参数与配置不一致的旧哈希在登录时重新计算
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
+
+class PasswordHasherBusy(Exception):
+    """密码哈希队列已满"""
+
+class PasswordHasher:
+    """
+    执行 bcrypt 计算的有界线程池
+
+    bcrypt 每次计算需要几十到几百毫秒 CPU（计算时释放 GIL），放在独立的线程池中执行，
+    同时执行的数量不超过 PASSWORD_HASH_WORKERS，另有 PASSWORD_HASH_QUEUE_SIZE 个排队位置；
+    队列已满时立即拒绝（PasswordHasherBusy），避免登录高峰占满所有请求线程。
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._metrics = {
+            "submitted": 0, "completed": 0, "rejected": 0, "running": 0,
+            "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "run_seconds_total": 0.0,
+        }
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._metrics["rejected"] += 1
+            raise PasswordHasherBusy()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hasher")
+            self._metrics["submitted"] += 1
+        try:
+            return self._executor.submit(self._run, time.monotonic(), fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _run(self, submitted_at: float, fn: Callable, *args) -> Any:
+        started_at = time.monotonic()
+        wait = started_at - submitted_at
+        with self._lock:
+            self._metrics["running"] += 1
+            self._metrics["wait_seconds_total"] += wait
+            self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], wait)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._metrics["running"] -= 1
+                self._metrics["completed"] += 1
+                self._metrics["run_seconds_total"] += time.monotonic() - started_at
+            self._slots.release()
+
+    def call(self, fn: Callable, *args) -> Any:
+        """
+        在线程池中执行并等待结果（供同步代码调用）
+        """
+        return self._submit(fn, *args).result()
+
+    async def acall(self, fn: Callable, *args) -> Any:
+        """
+        在线程池中执行并等待结果，等待期间不占用事件循环和请求线程
+        """
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+        completed = metrics["completed"] or 1
+        metrics.update(
+            workers=self.workers,
+            queue_size=self.queue_size,
+            queued=metrics["submitted"] - metrics["completed"] - metrics["running"],
+            wait_seconds_avg=metrics["wait_seconds_total"] / completed,
+            run_seconds_avg=metrics["run_seconds_total"] / completed,
+            bcrypt_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+        )
+        return metrics
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+# 全局密码哈希线程池
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE)
 
 def create_access_token(subject: int, expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -24,10 +123,16 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     验证密码
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.call(pwd_context.verify, plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """
     获取密码哈希
     """
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return password_hasher.call(pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    验证密码，返回 (是否正确, 新哈希)；哈希参数已变更时新哈希不为空，调用方应保存
+    """
+    return await password_hasher.acall(pwd_context.verify_and_update, plain_password, hashed_password) 
\ No newline at end of file
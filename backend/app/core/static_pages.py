@@ -0,0 +1,129 @@
+import gzip
+import time
+import hashlib
+from email.utils import formatdate
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi import Request
+from starlette.responses import Response
+
+from backend.app.core.config import settings
+from backend.app.core.responses import is_not_modified
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 未安装 brotli 时只提供 gzip
+    brotli = None
+
+# 协商编码时的优先顺序（同等 q 值下优先压缩率更高的编码）
+ENCODINGS = ("br", "gzip", "identity")
+
+def _parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """
+    解析 Accept-Encoding，返回 {编码: q 值}
+    """
+    accepted: Dict[str, float] = {}
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+class StaticPage:
+    """
+    预压缩的静态页面
+
+    页面内容只计算一次，同时保存原文、gzip 和 brotli（已安装时）三种编码，
+    每种编码使用各自的强 ETag；压缩后没有变小的编码不提供。
+    """
+
+    def __init__(self, render: Callable[[], Awaitable[str]], media_type: str = "text/html; charset=utf-8"):
+        self.render = render
+        self.media_type = media_type
+        self.bodies: Dict[str, bytes] = {}
+        self.etags: Dict[str, str] = {}
+        self.last_modified = ""
+        self.loaded_at = 0.0
+
+    async def load(self) -> None:
+        body = (await self.render()).encode("utf-8")
+        bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            bodies["br"] = brotli.compress(body, mode=brotli.MODE_TEXT, quality=11)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies = {
+            encoding: data for encoding, data in bodies.items()
+            if encoding == "identity" or len(data) < len(body)
+        }
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.bodies
+        }
+        self.loaded_at = time.time()
+        self.last_modified = formatdate(self.loaded_at, usegmt=True)
+
+    def negotiate(self, accept_encoding: Optional[str]) -> str:
+        accepted = _parse_accept_encoding(accept_encoding)
+        best, best_q = "identity", 0.0
+        for encoding in ENCODINGS:
+            if encoding not in self.bodies:
+                continue
+            q = accepted.get(encoding, accepted.get("*", 1.0 if encoding == "identity" else 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def response(self, request: Request) -> Response:
+        encoding = self.negotiate(request.headers.get("accept-encoding"))
+        headers = {
+            "ETag": self.etags[encoding],
+            "Last-Modified": self.last_modified,
+            "Cache-Control": settings.PAGE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if is_not_modified(request, self.etags[encoding], self.loaded_at):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.bodies[encoding], media_type=self.media_type, headers=headers)
+
+class StaticPages:
+    """
+    静态页面注册表：应用启动时统一生成并压缩，未启动（如直接调用）时在首次请求时生成
+    """
+
+    def __init__(self):
+        self.pages: List[StaticPage] = []
+
+    def page(self, render: Callable[[], Awaitable[str]]) -> Callable[[Request], Awaitable[Response]]:
+        """
+        将返回 HTML 字符串的路由函数包装为返回预压缩页面的路由函数
+        """
+        page = StaticPage(render)
+        self.pages.append(page)
+
+        async def endpoint(request: Request) -> Response:
+            if not page.bodies:
+                # 页面内容固定，并发请求重复生成一次也没有影响
+                await page.load()
+            return page.response(request)
+
+        endpoint.__name__ = render.__name__
+        endpoint.__doc__ = render.__doc__
+        return endpoint
+
+    async def load(self) -> None:
+        for page in self.pages:
+            await page.load()
+
+# 全局静态页面注册表
+static_pages = StaticPages()
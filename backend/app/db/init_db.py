@@ -4,9 +4,11 @@ from backend.app.db.base import Base
 from backend.app.db.session import engine, SessionLocal
 from backend.app.core.config import settings
 from backend.app.core.security import get_password_hash
-from backend.app.models import user, mindmap, tag, material, forum, user_activity
+from backend.app.models import user, mindmap, tag, material, forum, user_activity, search_index, blob, upload_session
 from backend.app.models.user import User
 from backend.app.models.mindmap import MindMap
+from backend.app.services.search_index import ensure_index
+from backend.app.services.tags import ensure_tag_closure
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,6 +18,8 @@ def init_db():
     Base.metadata.create_all(bind=engine)
     db = SessionLocal()
     create_first_admin(db)
+    ensure_index(db)
+    ensure_tag_closure(db)
     db.close()
 
 def create_first_admin(db: Session):
@@ -47,7 +51,12 @@ def get_all_models():
         forum.Post,
         forum.Comment,
         user_activity.Favorite,
-        user_activity.SearchHistory
+        user_activity.SearchHistory,
+        search_index.SearchPosting,
+        search_index.SearchTerm,
+        search_index.SearchDocument,
+        blob.FileBlob,
+        upload_session.UploadSession
     ]
 
 if __name__ == "__main__":
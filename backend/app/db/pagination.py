@@ -0,0 +1,101 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, or_, func, literal, DateTime
+from sqlalchemy.orm import Query
+
+class InvalidCursorError(ValueError):
+    """分页游标无法解析或与当前排序方式不匹配"""
+
+def encode_cursor(key: str, values: Sequence[Any]) -> str:
+    """
+    将排序键的值编码为不透明的游标字符串
+    """
+    payload = {
+        "k": key,
+        "v": [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, key: str) -> List[Any]:
+    """
+    解码游标，返回排序键的原始值列表
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_key, values = payload["k"], payload["v"]
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise InvalidCursorError("无效的分页游标")
+    if cursor_key != key or not isinstance(values, list):
+        raise InvalidCursorError("分页游标与排序方式不匹配")
+    return values
+
+def _sortable(expression, dialect_name: str):
+    """
+    SQLite 以文本存储时间，服务端默认值（CURRENT_TIMESTAMP）与 ORM 写入的值
+    小数秒格式不同，按字符串比较会出错，统一格式后再比较和排序
+    """
+    if dialect_name == "sqlite" and isinstance(expression.type, DateTime):
+        return func.strftime("%Y-%m-%d %H:%M:%f", expression)
+    return expression
+
+def keyset_condition(columns: Sequence[Any], values: Sequence[Any], descending: bool = True):
+    """
+    构造 (c1, c2, ...) < (v1, v2, ...) 的行比较条件（降序时），
+    展开为 OR/AND 形式以兼容不支持行值比较的数据库
+    """
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        compare = column < value if descending else column > value
+        equals = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*equals, compare))
+    return or_(*clauses)
+
+def keyset_page(
+    query: Query,
+    columns: Sequence[Any],
+    key: str,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    按 columns 做键集分页，返回 (当前页数据, 下一页游标)
+
+    columns 的最后一列必须唯一（通常为主键），保证排序稳定；
+    每页只按索引定位到游标位置后读取 limit+1 行，与页深无关。
+    """
+    dialect_name = query.session.get_bind().dialect.name
+    sort_columns = [_sortable(column, dialect_name) for column in columns]
+
+    if cursor:
+        values = decode_cursor(cursor, key)
+        if len(values) != len(columns):
+            raise InvalidCursorError("无效的分页游标")
+        try:
+            values = [
+                datetime.fromisoformat(value)
+                if value is not None and isinstance(column.type, DateTime) else value
+                for column, value in zip(columns, values)
+            ]
+        except (TypeError, ValueError):
+            raise InvalidCursorError("无效的分页游标")
+        values = [
+            _sortable(literal(value, type_=column.type), dialect_name)
+            for column, value in zip(columns, values)
+        ]
+        query = query.filter(keyset_condition(sort_columns, values, descending))
+
+    order = [column.desc() if descending else column.asc() for column in sort_columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(key, [getattr(last, column.key) for column in columns])
+    return rows, next_cursor
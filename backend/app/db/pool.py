@@ -0,0 +1,155 @@
+import time
+import threading
+from typing import Any, Dict, Optional
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from backend.app.core.config import settings
+
+# 等待连接耗时直方图的桶上界（秒）
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class PoolMetrics:
+    """
+    连接池指标：当前借出/溢出连接数、借出次数、等待超时次数和获取连接的等待时间分布
+
+    由连接池事件和 InstrumentedQueuePool 更新，用于按数据库连接数调整 worker 数量。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self._checked_out = 0
+        self._max_checked_out = 0
+        self._counters = {"checkouts": 0, "connects": 0, "invalidations": 0, "timeouts": 0}
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def attach(self, engine: Engine) -> None:
+        """
+        监听引擎连接池的事件；连接池重建（如 dispose）后继续使用同一个指标对象
+        """
+        self.pool = engine.pool
+        engine.pool.metrics = self
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "engine_disposed", lambda _engine: setattr(self, "pool", _engine.pool))
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self._counters["connects"] += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self._counters["checkouts"] += 1
+            self._checked_out += 1
+            self._max_checked_out = max(self._max_checked_out, self._checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self._checked_out = max(0, self._checked_out - 1)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self._counters["invalidations"] += 1
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            index = len(WAIT_BUCKETS)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    index = i
+                    break
+            self._wait_buckets[index] += 1
+            self._wait_count += 1
+            self._wait_total += seconds
+            self._wait_max = max(self._wait_max, seconds)
+            if timed_out:
+                self._counters["timeouts"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics: Dict[str, Any] = dict(self._counters)
+            metrics.update(
+                checked_out=self._checked_out,
+                max_checked_out=self._max_checked_out,
+                wait_count=self._wait_count,
+                wait_seconds_total=self._wait_total,
+                wait_seconds_max=self._wait_max,
+                wait_seconds_avg=self._wait_total / (self._wait_count or 1),
+            )
+            # 累计直方图：每个桶为等待时间不超过上界的次数
+            histogram, cumulative = {}, 0
+            for bound, count in zip(WAIT_BUCKETS + ("+Inf",), self._wait_buckets):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            metrics["wait_histogram"] = histogram
+
+        pool = self.pool
+        metrics["pool_class"] = type(pool).__name__ if pool is not None else None
+        if isinstance(pool, QueuePool):
+            metrics.update(
+                pool_size=pool.size(),
+                max_overflow=pool._max_overflow,
+                timeout=pool.timeout(),
+                overflow=max(0, pool.overflow()),
+                checked_in=pool.checkedin(),
+            )
+        return metrics
+
+class _InstrumentedPoolMixin:
+    """
+    记录每次从连接池获取连接的等待时间（包括溢出时新建连接的时间）
+    """
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def pool_options(url: str) -> Dict[str, Any]:
+    """
+    按配置生成 create_engine 的连接池参数
+
+    只有队列连接池（MySQL、文件型 SQLite）支持大小/溢出/超时设置；
+    内存 SQLite 等使用方言默认的连接池，只收集事件指标。
+    """
+    parsed = make_url(url)
+    pool_class = parsed.get_dialect().get_pool_class(parsed)
+    options: Dict[str, Any] = {
+        "pool_pre_ping": True,
+        "pool_recycle": settings.DB_POOL_RECYCLE,  # 防止MySQL连接超时
+    }
+    if issubclass(pool_class, QueuePool):
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if issubclass(pool_class, AsyncAdaptedQueuePool) else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_use_lifo=settings.DB_POOL_USE_LIFO,
+        )
+    return options
@@ -0,0 +1,88 @@
+import re
+import time
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 展开的 IN 参数列表 (?, ?, ?) 视为同一种语句
+_PARAMETER_LIST_RE = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """
+    语句的形状：合并空白和 IN 参数列表，参数不同的同一语句形状相同
+    """
+    shape = _WHITESPACE_RE.sub(" ", statement).strip()
+    return _PARAMETER_LIST_RE.sub("(?)", shape)
+
+class QueryStats:
+    """
+    单个请求内执行的 SQL 统计：语句数、数据库耗时和每种语句形状的执行次数
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Dict[str, List[float]] = {}
+        # 同步接口在线程池中执行，异步接口在事件循环中执行，统计对象可能被多个线程更新
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration: float) -> None:
+        shape = statement_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            entry = self.shapes.setdefault(shape, [0, 0.0])
+            entry[0] += 1
+            entry[1] += duration
+
+    def repeated(self, threshold: int) -> List[Dict[str, Any]]:
+        """
+        执行次数不少于 threshold 的查询语句（疑似 N+1），按次数降序
+        """
+        with self._lock:
+            items = [
+                {"statement": shape, "count": count, "duration_ms": round(duration * 1000, 2)}
+                for shape, (count, duration) in self.shapes.items()
+                if count >= threshold and shape.upper().startswith("SELECT")
+            ]
+        return sorted(items, key=lambda item: -item["count"])
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+def start() -> Any:
+    """
+    开始统计当前上下文（请求）中执行的 SQL，返回用于 stop() 的令牌
+    """
+    return _current.set(QueryStats())
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+def stop(token: Any) -> None:
+    _current.reset(token)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None and context is not None:
+        # 开始时间记录在本条语句的执行上下文上，执行出错时不会影响后续语句
+        context._query_stats_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    start = getattr(context, "_query_stats_start", None)
+    if stats is not None and start is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+_installed = False
+
+def install() -> None:
+    """
+    监听所有引擎（主库、只读副本、异步引擎）的语句执行事件
+    """
+    global _installed
+    if not _installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _installed = True
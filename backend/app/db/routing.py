@@ -0,0 +1,195 @@
+import time
+import logging
+import functools
+import itertools
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from backend.app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+class Replica:
+    """
+    只读副本：同步引擎和对应的异步引擎，以及最近一次检测到的复制延迟
+    """
+
+    def __init__(self, name: str, engine: Engine, async_engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.lag: Optional[float] = None  # None 表示尚未检测或不可用
+        self.checked_at = 0.0
+        self.error: Optional[str] = None
+        self.reads = 0
+        # 连接断开时立即停止使用，等待下一次检测恢复
+        for target in (engine, async_engine.sync_engine):
+            event.listen(target, "handle_error", self._on_error)
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect:
+            self.mark_down(str(context.original_exception))
+
+    def mark_down(self, error: str) -> None:
+        self.lag = None
+        self.error = error
+
+def measure_lag(connection: Connection) -> Optional[float]:
+    """
+    查询副本的复制延迟（秒）；复制已停止时返回 None
+    """
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        # MySQL 8.0.22 之后为 SHOW REPLICA STATUS，旧版本为 SHOW SLAVE STATUS
+        for statement, column in (
+            ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+            ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+        ):
+            try:
+                row = connection.exec_driver_sql(statement).mappings().first()
+            except DBAPIError:
+                continue
+            if row is None:
+                # 不是复制节点（例如直接指向主库），没有延迟
+                return 0.0
+            value = row.get(column)
+            return None if value is None else float(value)
+        return None
+    if dialect == "postgresql":
+        value = connection.exec_driver_sql(
+            "SELECT CASE WHEN pg_is_in_recovery() "
+            "THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) ELSE 0 END"
+        ).scalar()
+        return None if value is None else max(0.0, float(value))
+    connection.exec_driver_sql("SELECT 1")
+    return 0.0
+
+class ReplicaRouter:
+    """
+    只读查询路由
+
+    只有延迟不超过 max_lag 且最近检测过的副本会被使用，轮流分配；没有可用副本时回退到主库。
+    用户提交写操作后的 read_your_writes_window 秒内，该用户的读取仍走主库，避免读到旧数据
+    （按进程记录，多进程部署时窗口只在处理写请求的进程内生效）。
+    """
+
+    def __init__(self, replicas: List[Replica], max_lag: float, check_interval: float, read_your_writes_window: float):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._recent_writers = TTLCache(maxsize=100000, ttl=read_your_writes_window)
+        self._metrics = {"replica_reads": 0, "read_your_writes": 0, "fallbacks": 0}
+
+    def check(self) -> None:
+        """
+        检测所有副本的复制延迟
+        """
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as connection:
+                    lag = measure_lag(connection)
+                replica.error = None if lag is not None else "复制已停止"
+            except Exception as e:
+                lag = None
+                replica.error = str(e)
+                logger.warning(f"只读副本 {replica.name} 不可用: {e}")
+            replica.lag = lag
+            replica.checked_at = time.monotonic()
+
+    def _available(self, replica: Replica) -> bool:
+        # 检测结果过旧（检测任务停止或阻塞）时不再信任
+        fresh = time.monotonic() - replica.checked_at <= self.check_interval * 3
+        return fresh and replica.lag is not None and replica.lag <= self.max_lag
+
+    def choose(self, user_id: Optional[int] = None) -> Optional[Replica]:
+        """
+        选择一个可用副本，返回 None 时应使用主库
+        """
+        if user_id is not None and self._recent_writers.get(user_id) is not None:
+            self._count("read_your_writes")
+            return None
+        candidates = [replica for replica in self.replicas if self._available(replica)]
+        if not candidates:
+            self._count("fallbacks")
+            return None
+        replica = candidates[next(self._next) % len(candidates)]
+        self._count("replica_reads")
+        replica.reads += 1
+        return replica
+
+    def note_write(self, user_id: int) -> None:
+        self._recent_writers.set(user_id, True)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._metrics[name] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics: Dict[str, Any] = dict(self._metrics)
+        now = time.monotonic()
+        metrics["replicas"] = [
+            {
+                "name": replica.name,
+                "available": self._available(replica),
+                "lag_seconds": replica.lag,
+                "checked_seconds_ago": now - replica.checked_at if replica.checked_at else None,
+                "error": replica.error,
+                "reads": replica.reads,
+            }
+            for replica in self.replicas
+        ]
+        return metrics
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose()
+            await replica.async_engine.dispose()
+
+class RoutingSession(Session):
+    """
+    按语句选择连接的会话
+
+    在 read_only 标记的服务函数内执行的查询发往只读副本；刷新、UPDATE/DELETE 等写操作
+    始终走主库，且会话一旦写过数据，之后的读取也都走主库。
+    会话 info 中的 router 为 None 时（未配置副本）与普通会话相同。
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        router: Optional[ReplicaRouter] = self.info.get("router")
+        if router is not None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info["wrote"] = True
+            elif self.info.get("read_only") and not self.info.get("wrote"):
+                replica = router.choose(self.info.get("user_id"))
+                if replica is not None:
+                    return replica.async_engine.sync_engine if self.info.get("async") else replica.engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_writer(session: Session) -> None:
+    router = session.info.get("router")
+    user_id = session.info.get("user_id")
+    if router is not None and user_id is not None and session.info.get("wrote"):
+        router.note_write(user_id)
+
+def read_only(func: Callable) -> Callable:
+    """
+    标记只读服务函数：函数内的查询可以发往只读副本（第一个参数为数据库会话）
+    """
+    @functools.wraps(func)
+    def wrapper(db: Session, *args, **kwargs):
+        previous = db.info.get("read_only", False)
+        db.info["read_only"] = True
+        try:
+            return func(db, *args, **kwargs)
+        finally:
+            db.info["read_only"] = previous
+    return wrapper
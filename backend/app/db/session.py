@@ -1,25 +1,84 @@
 import os
+from typing import AsyncGenerator
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from backend.app.core.config import settings
+from backend.app.db.pool import PoolMetrics, pool_options
+from backend.app.db.routing import Replica, ReplicaRouter, RoutingSession
 
 # 创建SQLite数据库URL
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
 # 创建SQLAlchemy引擎
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    pool_pre_ping=True,
-    pool_recycle=3600,  # 防止MySQL连接超时
-)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options(SQLALCHEMY_DATABASE_URL))
+
+# 连接池指标
+pool_metrics = PoolMetrics("sync")
+pool_metrics.attach(engine)
+
+# 同步驱动对应的异步驱动
+_ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str) -> str:
+    """
+    将同步数据库URL转换为对应异步驱动的URL
+    """
+    parsed = make_url(url)
+    drivername = _ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+# 异步引擎：与同步引擎连接同一数据库，供异步接口使用
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **pool_options(ASYNC_SQLALCHEMY_DATABASE_URL))
+
+async_pool_metrics = PoolMetrics("async")
+async_pool_metrics.attach(async_engine.sync_engine)
+
+def _create_replica(index: int, url: str) -> Replica:
+    async_url = async_database_url(url)
+    return Replica(
+        f"replica-{index}",
+        create_engine(url, **pool_options(url)),
+        create_async_engine(async_url, **pool_options(async_url)),
+    )
+
+# 只读副本路由（未配置 DATABASE_REPLICA_URLS 时为 None，所有查询走主库）
+replica_router = ReplicaRouter(
+    [_create_replica(index, url) for index, url in enumerate(settings.DATABASE_REPLICA_URLS)],
+    max_lag=settings.REPLICA_MAX_LAG,
+    check_interval=settings.REPLICA_LAG_CHECK_INTERVAL,
+    read_your_writes_window=settings.READ_YOUR_WRITES_WINDOW,
+) if settings.DATABASE_REPLICA_URLS else None
 
 # 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine,
+    class_=RoutingSession, info={"router": replica_router}
+)
+
+# 异步会话工厂；提交后不过期对象，返回的对象可以在会话之外序列化
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, expire_on_commit=False, autoflush=False,
+    sync_session_class=RoutingSession, info={"router": replica_router, "async": True}
+)
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close() 
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
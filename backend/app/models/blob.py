@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, BigInteger, String
+from backend.app.db.base import Base, TimestampMixin
+
+class FileBlob(Base, TimestampMixin):
+    """按内容（SHA-256）去重存储的文件，ref_count 为引用该文件的资料数"""
+    __tablename__ = "file_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<FileBlob(sha256={self.sha256}, ref_count={self.ref_count})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from backend.app.db.base import Base, TimestampMixin
 
@@ -19,6 +19,11 @@ class Post(Base, TimestampMixin):
     owner = relationship("User", back_populates="posts")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # 帖子列表按 (created_at, id) 键集分页
+        Index("ix_forum_posts_created_at_id", "created_at", "id"),
+    )
+    
     def __repr__(self):
         return f"<Post(id={self.id}, title={self.title})>"
     
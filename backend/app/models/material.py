@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Table, Boolean, Index
 from sqlalchemy.orm import relationship
 from backend.app.db.base import Base, TimestampMixin
 
@@ -19,6 +19,9 @@ class Material(Base, TimestampMixin):
     content = Column(String, nullable=True)  # 可以是文本内容或JSON格式
     file_path = Column(String, nullable=True)  # 文件路径，如果是上传的文件
     file_type = Column(String, nullable=True)  # 文件类型
+    file_size = Column(BigInteger, nullable=True)  # 文件大小（字节）
+    file_hash = Column(String(64), nullable=True)  # 文件内容的SHA-256，对应 file_blobs 中的记录
+    file_name = Column(String, nullable=True)  # 上传时的原始文件名
     owner_id = Column(Integer, ForeignKey("users.id"))
     mindmap_id = Column(Integer, ForeignKey("mindmaps.id"), nullable=True)
     
@@ -34,6 +37,15 @@ class Material(Base, TimestampMixin):
     
     # 新添加的字段
     is_public = Column(Boolean, default=False)  # 是否公开
+    
+    # 文件文本提取状态：pending / processing / done / failed，不需要提取的资料为空
+    extraction_status = Column(String(16), nullable=True, index=True)
+    extraction_error = Column(String(255), nullable=True)
+    
+    __table_args__ = (
+        # 列表按 (created_at, id) 键集分页
+        Index("ix_materials_created_at_id", "created_at", "id"),
+    )
 
     def __repr__(self):
         return f"<Material(id={self.id}, title={self.title})>" 
\ No newline at end of file
@@ -1,5 +1,5 @@
 import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table, Boolean, Index
 from sqlalchemy.orm import relationship
 from backend.app.db.base import Base, TimestampMixin
 
@@ -27,4 +27,9 @@ class MindMap(Base, TimestampMixin):
     # 关系
     user = relationship("User", back_populates="mindmaps")
     tags = relationship("Tag", secondary=mindmap_tag, back_populates="mindmaps")
-    materials = relationship("Material", back_populates="mindmap") 
\ No newline at end of file
+    materials = relationship("Material", back_populates="mindmap")
+    
+    __table_args__ = (
+        # 用户的思维导图列表按 (created_at, id) 键集分页
+        Index("ix_mindmaps_user_id_created_at_id", "user_id", "created_at", "id"),
+    ) 
\ No newline at end of file
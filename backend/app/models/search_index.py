@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from backend.app.db.base import Base
+
+# 词项按二进制比较：MySQL 默认的 utf8mb4 排序规则不区分大小写和重音，
+# 会把分词结果中不同的词项（如 "café" 与 "cafe"）视为同一个主键
+TermType = String(64).with_variant(String(64, collation="utf8mb4_bin"), "mysql", "mariadb")
+
+class SearchPosting(Base):
+    """倒排索引：词项 -> 资料ID倒排列表"""
+    __tablename__ = "search_postings"
+
+    term = Column(TermType, primary_key=True)
+    field = Column(String(16), primary_key=True)  # title / description / content
+    material_id = Column(Integer, ForeignKey("materials.id", ondelete="CASCADE"), primary_key=True)
+    term_frequency = Column(Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        # 按资料删除/重建索引时使用
+        Index("ix_search_postings_material_id", "material_id"),
+    )
+
+    def __repr__(self):
+        return f"<SearchPosting(term={self.term}, field={self.field}, material_id={self.material_id})>"
+
+class SearchTerm(Base):
+    """词项统计：文档频率（包含该词项的资料数）和最大词频（用于估计打分上界）"""
+    __tablename__ = "search_terms"
+
+    term = Column(TermType, primary_key=True)
+    document_frequency = Column(Integer, nullable=False, default=0)
+    max_term_frequency = Column(Integer, nullable=False, default=0)  # 单个字段中的最大词频，只增不减
+
+    def __repr__(self):
+        return f"<SearchTerm(term={self.term}, document_frequency={self.document_frequency})>"
+
+class SearchDocument(Base):
+    """资料统计：各索引字段的词项数，用于BM25长度归一化"""
+    __tablename__ = "search_documents"
+
+    material_id = Column(Integer, ForeignKey("materials.id", ondelete="CASCADE"), primary_key=True)
+    title_length = Column(Integer, nullable=False, default=0)
+    description_length = Column(Integer, nullable=False, default=0)
+    content_length = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SearchDocument(material_id={self.material_id})>"
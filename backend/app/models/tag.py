@@ -1,13 +1,33 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 from backend.app.db.base import Base, TimestampMixin
 
-# 标签之间的层级关系
+# 标签之间的层级关系（一个标签可以有多个父标签）
 tag_hierarchy = Table(
     "tag_hierarchy",
     Base.metadata,
-    Column("parent_id", Integer, ForeignKey("tags.id")),
-    Column("child_id", Integer, ForeignKey("tags.id"))
+    Column("parent_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    Column("child_id", Integer, ForeignKey("tags.id"), primary_key=True)
+)
+
+# 层级关系的传递闭包：每对 (祖先, 后代) 一行，不含标签自身
+# path_count 为两者之间的路径数，删除一条层级关系后路径数为 0 的行随之删除
+tag_closure = Table(
+    "tag_closure",
+    Base.metadata,
+    Column("ancestor_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    Column("descendant_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    Column("path_count", Integer, nullable=False, default=1),
+    # 主键覆盖按祖先查后代，该索引覆盖按后代查祖先
+    Index("ix_tag_closure_descendant_ancestor", "descendant_id", "ancestor_id")
+)
+
+# 层级修改锁：只有一行，修改层级关系前更新该行，使并发的修改依次执行
+tag_hierarchy_lock = Table(
+    "tag_hierarchy_lock",
+    Base.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("version", Integer, nullable=False, default=0)
 )
 
 class Tag(Base, TimestampMixin):
@@ -22,10 +42,18 @@ class Tag(Base, TimestampMixin):
     materials = relationship("Material", secondary="material_tags", back_populates="tags")
     
     # 自引用关系，用于标签层级结构
+    # 只读：层级关系通过 services.tags 修改，以便同步维护 tag_closure
     parent_tags = relationship(
         "Tag", 
         secondary=tag_hierarchy,
         primaryjoin=(tag_hierarchy.c.child_id == id),
         secondaryjoin=(tag_hierarchy.c.parent_id == id),
-        backref="child_tags"
-    ) 
\ No newline at end of file
+        viewonly=True
+    )
+    child_tags = relationship(
+        "Tag", 
+        secondary=tag_hierarchy,
+        primaryjoin=(tag_hierarchy.c.parent_id == id),
+        secondaryjoin=(tag_hierarchy.c.child_id == id),
+        viewonly=True
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime
+from backend.app.db.base import Base, TimestampMixin
+
+class UploadSession(Base, TimestampMixin):
+    """
+    分片上传会话
+
+    分片内容保存在 UPLOAD_DIR/sessions/<id>/ 下，记录只在会话进行中存在，
+    完成或取消后删除；超过 expires_at 未完成的会话由后台任务清理。
+    """
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    file_name = Column(String(255), nullable=False)
+    file_size = Column(BigInteger, nullable=True)  # 客户端声明的文件总大小（可选）
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<UploadSession(id={self.id}, file_name={self.file_name})>"
@@ -24,7 +24,7 @@ class Comment(CommentBase):
     }
 
 class CommentWithReplies(Comment):
-    replies: List[Comment] = []
+    replies: List["CommentWithReplies"] = []  # 回复的回复同样嵌套在 replies 中
 
 class PostBase(BaseModel):
     title: str
@@ -52,4 +52,5 @@ class Post(PostBase):
     }
 
 class PostWithComments(Post):
-    comments: List[CommentWithReplies] = [] 
\ No newline at end of file
+    comments: List[CommentWithReplies] = []  # 顶级评论，回复嵌套在各评论的 replies 中
+    comments_next_cursor: Optional[str] = None  # 分页获取评论时下一页的游标
\ No newline at end of file
@@ -1,8 +1,18 @@
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from datetime import datetime
+from backend.app.core.config import settings
+from backend.app.core.previews import derivative_version, has_derivatives
 from .tag import Tag
 
+def thumbnail_url(material, kind: str = "thumbnail") -> Optional[str]:
+    """
+    缩略图/预览图地址（带缓存版本号）；material 为资料对象或包含文件信息列的查询结果行
+    """
+    if not has_derivatives(material):
+        return None
+    return f"{settings.API_PREFIX}/materials/{material.id}/{kind}?v={derivative_version(material)}"
+
 class MaterialBase(BaseModel):
     title: str
     description: Optional[str] = None
@@ -28,16 +38,55 @@ class Material(MaterialBase):
     owner_id: int
     file_path: Optional[str] = None
     file_type: Optional[str] = None
+    file_size: Optional[int] = None
+    file_name: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     view_count: int
     like_count: int
     is_public: bool = False
+    extraction_status: Optional[str] = None  # 文件文本提取状态：pending/processing/done/failed
+    extraction_error: Optional[str] = None
+    thumbnail_url: Optional[str] = None  # 地址带版本号，可长期缓存
+    preview_url: Optional[str] = None
     
     model_config = {
         "from_attributes": True
     }
+    
+    @model_validator(mode="wrap")
+    @classmethod
+    def derivative_urls(cls, data, handler):
+        # 由资料对象校验时根据文件信息生成缩略图/预览图地址（字典数据已包含这两个字段）
+        material = handler(data)
+        if not isinstance(data, dict):
+            material.thumbnail_url = thumbnail_url(data, "thumbnail")
+            material.preview_url = thumbnail_url(data, "preview")
+        return material
 
 class MaterialWithDetails(Material):
     tags: List[Tag] = []
-    mindmap_id: Optional[int] = None 
\ No newline at end of file
+    mindmap_id: Optional[int] = None 
+
+
+class UploadSessionCreate(BaseModel):
+    file_name: str
+    file_size: Optional[int] = None  # 文件总大小（字节），提供时完成上传会校验
+
+class UploadSessionPart(BaseModel):
+    part_number: int
+    size: int
+
+class UploadSession(BaseModel):
+    id: str
+    file_name: str
+    file_size: Optional[int] = None
+    expires_at: datetime
+    part_size_limit: int
+    parts: List[UploadSessionPart] = []
+
+class UploadSessionComplete(MaterialBase):
+    tags: Optional[List[int]] = None
+    mindmap_id: Optional[int] = None
+    is_public: bool = False
+    sha256: Optional[str] = None  # 客户端计算的文件哈希（可选），提供时校验
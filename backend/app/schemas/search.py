@@ -20,7 +20,10 @@ class SearchResult(BaseModel):
     query: str
     
 class KeywordSearchResult(SearchResult):
+    total: Optional[int] = None  # count=none 时不统计
+    total_exact: bool = True  # 为 False 时 total 为估算值或缓存值
     items: List[Material]
+    next_cursor: Optional[str] = None  # 下一页游标，没有更多结果时为空
     
 class MindMapSearchResult(SearchResult):
     items: List[MindMap]
@@ -0,0 +1,180 @@
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from backend.app.core.config import settings
+from backend.app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+class CounterBuffer:
+    """
+    计数器写回缓冲
+
+    浏览/点赞等计数的增量先累加在内存中，由后台线程每隔
+    COUNTER_FLUSH_INTERVAL 秒（或待写条目超过 COUNTER_MAX_PENDING 时）
+    以批量的 UPDATE ... SET field = field + n 写回数据库。
+    进程崩溃最多丢失一个刷新周期内的增量。
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[type, str], Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self._size = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def increment(self, model, field: str, item_id: int, amount: int = 1) -> None:
+        with self._lock:
+            deltas = self._pending[(model, field)]
+            if item_id not in deltas:
+                self._size += 1
+            deltas[item_id] += amount
+            size = self._size
+        if size >= settings.COUNTER_MAX_PENDING:
+            self._wakeup.set()
+
+    def pending(self, model, field: str, item_id: int) -> int:
+        with self._lock:
+            deltas = self._pending.get((model, field))
+            return deltas.get(item_id, 0) if deltas else 0
+
+    def apply_pending(self, items: Iterable, fields: Iterable[str]) -> None:
+        """
+        将尚未写回的增量合并到已加载的对象上（不标记为脏数据，不会被当作修改提交）
+        """
+        fields = list(fields)
+        with self._lock:
+            for item in items:
+                for field in fields:
+                    deltas = self._pending.get((type(item), field))
+                    delta = deltas.get(item.id, 0) if deltas else 0
+                    if delta:
+                        set_committed_value(item, field, (getattr(item, field) or 0) + delta)
+
+    def flush(self, db: Session) -> int:
+        """
+        将所有待写增量批量写回，返回写回的条目数；失败时增量放回缓冲
+        """
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+            self._size = 0
+        if not pending:
+            return 0
+
+        try:
+            for (model, field), deltas in pending.items():
+                params = [
+                    {"item_id": item_id, "delta": delta}
+                    for item_id, delta in deltas.items() if delta
+                ]
+                if not params:
+                    continue
+                table = model.__table__
+                statement = update(table).where(
+                    table.c.id == bindparam("item_id")
+                ).values({field: func.coalesce(table.c[field], 0) + bindparam("delta")})
+                db.execute(statement, params)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                for key, deltas in pending.items():
+                    for item_id, delta in deltas.items():
+                        if item_id not in self._pending[key]:
+                            self._size += 1
+                        self._pending[key][item_id] += delta
+            raise
+        return sum(len(deltas) for deltas in pending.values())
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="counter-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        停止后台线程并写回剩余增量
+        """
+        if self._thread is not None:
+            self._stopped.set()
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        self._flush_with_new_session()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(settings.COUNTER_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            self._flush_with_new_session()
+
+    def _flush_with_new_session(self) -> None:
+        db = SessionLocal()
+        try:
+            self.flush(db)
+        except Exception:
+            logger.exception("计数器写回失败，增量将在下次重试")
+        finally:
+            db.close()
+
+# 全局计数器缓冲
+counter_buffer = CounterBuffer()
+
+def increment(
+    db: Session,
+    model,
+    field: str,
+    item_id: int,
+    amount: int = 1,
+    criteria: Iterable = (),
+    target=None
+) -> bool:
+    """
+    增加计数，返回记录是否存在（且满足 criteria 中的附加条件）
+
+    启用写回时只累加到内存缓冲；未传入已加载的 target 时以一条只查主键的 SELECT 检查存在性。
+    未启用写回时执行一条原子的 UPDATE ... WHERE id = ? [AND criteria]，由影响行数判断记录是否存在；
+    数据库支持 UPDATE ... RETURNING 时同时取回最新的计数。
+    传入 target（已加载且已合并待写增量的对象）时，其计数同步为增加后的值。
+    """
+    criteria = list(criteria)
+    if settings.COUNTER_WRITE_BEHIND:
+        if target is None or criteria:
+            exists = db.query(model.id).filter(model.id == item_id, *criteria).first()
+            if exists is None:
+                return False
+        counter_buffer.increment(model, field, item_id, amount)
+        if target is not None:
+            set_committed_value(target, field, (getattr(target, field) or 0) + amount)
+        return True
+    
+    table = model.__table__
+    statement = update(table).where(table.c.id == item_id, *criteria).values(
+        {field: func.coalesce(table.c[field], 0) + amount}
+    )
+    returning = target is not None and db.get_bind().dialect.update_returning
+    if returning:
+        row = db.execute(statement.returning(table.c[field])).first()
+        found = row is not None
+    else:
+        found = db.execute(statement).rowcount > 0
+    db.commit()
+    
+    if found and target is not None:
+        if returning:
+            set_committed_value(target, field, row[0])
+        else:
+            # 不支持 RETURNING（MySQL）时重新读取该字段
+            db.refresh(target, [field])
+    return found
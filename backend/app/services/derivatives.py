@@ -0,0 +1,118 @@
+import os
+import shutil
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional
+
+from backend.app.core.cache import TTLCache
+from backend.app.core.config import settings
+from backend.app.core.previews import file_extension, has_derivatives
+from backend.app.models.material import Material
+from backend.app.services import imaging
+
+logger = logging.getLogger(__name__)
+
+# 衍生图种类，尺寸见 THUMBNAIL_SIZE / PREVIEW_SIZE
+KINDS = ("thumbnail", "preview")
+
+def _sizes() -> Dict[str, int]:
+    return {"thumbnail": settings.THUMBNAIL_SIZE, "preview": settings.PREVIEW_SIZE}
+
+def derivative_key(material: Material) -> str:
+    """
+    衍生图按文件内容存放，相同文件的资料共用；内容寻址存储之前上传的文件按资料 ID 存放
+    """
+    return material.file_hash or f"material-{material.id}"
+
+def derivative_dir(key: str) -> str:
+    return os.path.join(settings.UPLOAD_DIR, "derivatives", key[:2], key)
+
+def derivative_path(material: Material, kind: str) -> str:
+    return os.path.join(derivative_dir(derivative_key(material)), f"{kind}.jpg")
+
+def remove_derivatives(key: str) -> None:
+    shutil.rmtree(derivative_dir(key), ignore_errors=True)
+
+class DerivativeGenerator:
+    """
+    缩略图/预览图生成器
+
+    解码和缩放图片是 CPU 密集型操作，在独立的进程池中执行。上传后立即提交生成任务；
+    衍生图文件缺失（清理缓存、生成失败、服务重启前未完成）时，在首次请求时重新生成。
+    同一文件的生成任务同时只会执行一次。
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        # 无法生成缩略图的文件，避免每次请求都重新尝试
+        self._failures = TTLCache(maxsize=10000, ttl=600)
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.DERIVATIVE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, material: Material) -> Optional[Future]:
+        """
+        提交生成任务，返回任务的 Future；已在生成中时返回同一个 Future
+        """
+        if self._executor is None or not has_derivatives(material):
+            return None
+        key = derivative_key(material)
+        if self._failures.get(key) is not None:
+            return None
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            sizes = _sizes()
+            outputs = [(derivative_path(material, kind), sizes[kind]) for kind in KINDS]
+            future = self._executor.submit(
+                imaging.render_derivatives, material.file_path, file_extension(material), outputs
+            )
+            self._inflight[key] = future
+        future.add_done_callback(lambda f: self._on_done(key, f))
+        return future
+
+    def _on_done(self, key: str, future: Future) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self._failures.set(key, str(error))
+            if not isinstance(error, imaging.UnsupportedPreview):
+                logger.error(f"生成缩略图失败: {key}", exc_info=error)
+
+    async def ensure(self, material: Material, kind: str) -> Optional[str]:
+        """
+        返回衍生图路径，文件缺失时生成；无法生成时返回 None
+        """
+        path = derivative_path(material, kind)
+        if os.path.exists(path):
+            return path
+        future = self.submit(material)
+        if future is None:
+            return None
+        try:
+            # 请求被取消时不取消共享的生成任务
+            await asyncio.shield(asyncio.wrap_future(future))
+        except Exception:
+            return None
+        return path if os.path.exists(path) else None
+
+# 全局缩略图生成器
+derivative_generator = DerivativeGenerator()
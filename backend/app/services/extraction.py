@@ -0,0 +1,218 @@
+import os
+import queue
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from typing import Optional, Tuple
+
+from backend.app.core.config import settings
+from backend.app.db.session import SessionLocal
+from backend.app.models.material import Material
+from backend.app.services import extractors
+from backend.app.services.search_index import get_search_backend
+
+logger = logging.getLogger(__name__)
+
+# 提取状态
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+def needs_extraction(file_name: Optional[str]) -> bool:
+    """
+    文件是否需要提取文本（按扩展名判断）
+    """
+    return bool(file_name) and extractors.is_supported(os.path.splitext(file_name)[1])
+
+class ExtractionQueue:
+    """
+    文件文本提取任务队列
+
+    资料的 extraction_status 是持久化的任务状态，内存队列中只保存资料 ID。
+    调度线程从队列取出任务，提交到进程池解析文件（解析是 CPU 密集型操作，
+    不占用请求线程和 GIL）；写入线程将结果写入 Material.content 并更新搜索索引。
+    进程重启后，状态为 pending/processing 的资料会重新入队。
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[int]" = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # 进程池完成的任务 (资料ID, future)，由写入线程保存结果
+        self._results: "queue.Queue[Tuple[int, Future]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[threading.Semaphore] = None
+
+    def enqueue(self, material_id: int) -> None:
+        self._queue.put(material_id)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._thread is not None or not settings.EXTRACTION_ENABLED:
+            return
+        self._stopped.clear()
+        # 使用 spawn 启动子进程，避免 fork 时复制数据库连接和后台线程
+        self._executor = ProcessPoolExecutor(
+            max_workers=settings.EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        # 限制同时提交到进程池的任务数，其余任务留在队列中
+        self._slots = threading.Semaphore(settings.EXTRACTION_WORKERS * 2)
+        self._thread = threading.Thread(target=self._run, name="text-extractor", daemon=True)
+        self._thread.start()
+        self._writer = threading.Thread(target=self._write_results, name="text-extraction-writer", daemon=True)
+        self._writer.start()
+        self._recover()
+
+    def stop(self) -> None:
+        """
+        停止调度线程和进程池；未完成的任务保持 pending/processing 状态，下次启动时恢复
+        """
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self._writer.join()
+        self._writer = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    def _recover(self) -> None:
+        db = SessionLocal()
+        try:
+            material_ids = db.query(Material.id).filter(
+                Material.extraction_status.in_([PENDING, PROCESSING])
+            ).order_by(Material.id).all()
+        finally:
+            db.close()
+        for (material_id,) in material_ids:
+            self.enqueue(material_id)
+        if material_ids:
+            logger.info(f"恢复 {len(material_ids)} 个未完成的文本提取任务")
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                material_id = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            while not self._slots.acquire(timeout=1.0):
+                if self._stopped.is_set():
+                    return
+            try:
+                future = self._submit(material_id)
+            except Exception:
+                future = None
+                logger.exception(f"提交文本提取任务失败: material_id={material_id}")
+            if future is None:
+                self._slots.release()
+            else:
+                future.add_done_callback(partial(self._on_done, material_id))
+
+    def _on_done(self, material_id: int, future: Future) -> None:
+        # 回调在进程池的管理线程中执行，这里只转交结果，避免阻塞其他任务的结果收集和派发
+        self._results.put((material_id, future))
+
+    def _write_results(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                material_id, future = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                self._save_result(material_id, future)
+            finally:
+                # 保存完成后才释放名额，待保存的结果（提取的文本）数量也受名额限制
+                self._slots.release()
+
+    def _submit(self, material_id: int) -> Optional[Future]:
+        """
+        将资料提交到进程池，不需要提取时返回 None
+        """
+        db = SessionLocal()
+        try:
+            material = db.query(Material).filter(Material.id == material_id).first()
+            if not material or material.extraction_status not in (PENDING, PROCESSING):
+                return None
+            if not material.file_path or not os.path.isfile(material.file_path):
+                self._finish(db, material, FAILED, error="文件不存在")
+                return None
+            if os.path.getsize(material.file_path) > settings.EXTRACTION_MAX_FILE_SIZE:
+                self._finish(db, material, FAILED, error="文件过大，跳过文本提取")
+                return None
+            material.extraction_status = PROCESSING
+            db.commit()
+            extension = os.path.splitext(material.file_name or material.file_path)[1]
+            return self._executor.submit(
+                extractors.extract_text, material.file_path, extension, settings.EXTRACTION_MAX_CHARS
+            )
+        finally:
+            db.close()
+
+    def _save_result(self, material_id: int, future: Future) -> None:
+        if future.cancelled():
+            return
+        db = SessionLocal()
+        try:
+            material = db.query(Material).filter(Material.id == material_id).first()
+            if not material:
+                # 提取期间资料已被删除
+                return
+            try:
+                text = future.result()
+            except extractors.UnsupportedDocument as e:
+                self._finish(db, material, FAILED, error=str(e))
+            except Exception as e:
+                logger.exception(f"文本提取失败: material_id={material_id}")
+                self._finish(db, material, FAILED, error=f"文本提取失败: {e.__class__.__name__}")
+            else:
+                self._finish(db, material, DONE, text=text)
+        except Exception:
+            db.rollback()
+            logger.exception(f"保存文本提取结果失败: material_id={material_id}")
+        finally:
+            db.close()
+
+    def _finish(self, db, material: Material, status: str, text: Optional[str] = None,
+                error: Optional[str] = None) -> None:
+        material.extraction_status = status
+        material.extraction_error = error[:255] if error else None
+        # 不覆盖用户手动填写的内容
+        if text and not material.content:
+            material.content = text
+            get_search_backend().index_material(db, material)
+        db.commit()
+
+# 全局文本提取队列
+extraction_queue = ExtractionQueue()
+
+def mark_existing(db) -> int:
+    """
+    将尚未提取过文本的已有资料标记为待提取，返回标记的资料数（下次启动时处理）
+    """
+    candidates = db.query(Material).filter(
+        Material.extraction_status.is_(None),
+        Material.file_path.isnot(None)
+    ).all()
+    count = 0
+    for material in candidates:
+        if needs_extraction(material.file_name or material.file_path):
+            material.extraction_status = PENDING
+            count += 1
+    db.commit()
+    return count
+
+if __name__ == "__main__":
+    from backend.app.db import init_db  # noqa: F401  注册所有模型
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    count = mark_existing(db)
+    logger.info(f"已将 {count} 条资料标记为待提取文本")
+    db.close()
@@ -0,0 +1,102 @@
+"""
+文档文本提取
+
+本模块在提取进程池的子进程中运行，只依赖标准库（PDF 需要可选依赖 pypdf），
+不要在这里导入数据库或应用配置相关的模块。
+"""
+import re
+import zipfile
+from typing import Callable, Dict, Iterator, List
+from xml.etree import ElementTree
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - 未安装 pypdf 时不提取 PDF
+    PdfReader = None
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_S = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+class UnsupportedDocument(Exception):
+    """不支持提取文本的文件格式"""
+
+def _read_plain_text(path: str) -> Iterator[str]:
+    with open(path, "rb") as f:
+        data = f.read()
+    for encoding in ("utf-8-sig", "gb18030"):
+        try:
+            yield data.decode(encoding)
+            return
+        except UnicodeDecodeError:
+            continue
+    yield data.decode("utf-8", errors="replace")
+
+def _xml_paragraphs(xml: bytes, paragraph_tag: str, text_tag: str) -> Iterator[str]:
+    root = ElementTree.fromstring(xml)
+    for paragraph in root.iter(paragraph_tag):
+        text = "".join(node.text or "" for node in paragraph.iter(text_tag))
+        if text.strip():
+            yield text
+
+def _read_docx(path: str) -> Iterator[str]:
+    with zipfile.ZipFile(path) as archive:
+        yield from _xml_paragraphs(archive.read("word/document.xml"), f"{_W}p", f"{_W}t")
+
+def _read_pptx(path: str) -> Iterator[str]:
+    with zipfile.ZipFile(path) as archive:
+        slides = [
+            name for name in archive.namelist()
+            if re.match(r"^ppt/slides/slide\d+\.xml$", name)
+        ]
+        slides.sort(key=lambda name: int(re.search(r"(\d+)\.xml$", name).group(1)))
+        for name in slides:
+            yield from _xml_paragraphs(archive.read(name), f"{_A}p", f"{_A}t")
+
+def _read_xlsx(path: str) -> Iterator[str]:
+    with zipfile.ZipFile(path) as archive:
+        # 单元格中的文本集中保存在共享字符串表中
+        if "xl/sharedStrings.xml" in archive.namelist():
+            yield from _xml_paragraphs(archive.read("xl/sharedStrings.xml"), f"{_S}si", f"{_S}t")
+
+def _read_pdf(path: str) -> Iterator[str]:
+    if PdfReader is None:
+        raise UnsupportedDocument("未安装 pypdf，无法提取 PDF 文本")
+    reader = PdfReader(path)
+    # 逐页提取，达到长度上限后不再解析后续页面
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        if text.strip():
+            yield text
+
+EXTRACTORS: Dict[str, Callable[[str], Iterator[str]]] = {
+    ".txt": _read_plain_text,
+    ".md": _read_plain_text,
+    ".docx": _read_docx,
+    ".pptx": _read_pptx,
+    ".xlsx": _read_xlsx,
+    ".pdf": _read_pdf,
+}
+
+def is_supported(extension: str) -> bool:
+    return extension.lower() in EXTRACTORS
+
+def extract_text(path: str, extension: str, max_chars: int) -> str:
+    """
+    提取文件中的文本，最多返回 max_chars 个字符
+    """
+    extractor = EXTRACTORS.get(extension.lower())
+    if extractor is None:
+        raise UnsupportedDocument(f"不支持提取 {extension} 文件的文本")
+
+    parts: List[str] = []
+    length = 0
+    try:
+        for text in extractor(path):
+            parts.append(text[:max_chars - length])
+            length += len(parts[-1])
+            if length >= max_chars:
+                break
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise UnsupportedDocument(f"文件已损坏或格式不正确: {e}")
+    return "\n".join(parts)
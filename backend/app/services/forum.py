@@ -1,12 +1,44 @@
-from typing import List, Optional
-from sqlalchemy import desc
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from backend.app.db.pagination import keyset_page
+from backend.app.db.routing import read_only
 from backend.app.models.forum import Post, Comment
+from backend.app.models.user import User
 from backend.app.schemas.forum import PostCreate, PostUpdate, CommentCreate
+from backend.app.core.config import settings
+from backend.app.services import counters, projections
 
+@read_only
 def get_posts(db: Session, skip: int = 0, limit: int = 100) -> List[Post]:
     """获取所有帖子"""
-    return db.query(Post).order_by(desc(Post.created_at)).offset(skip).limit(limit).all()
+    posts = db.query(Post).options(joinedload(Post.owner)).order_by(
+        desc(Post.created_at), desc(Post.id)
+    ).offset(skip).limit(limit).all()
+    return apply_pending_counts(posts)
+
+@read_only
+def get_posts_by_cursor(db: Session, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Post], Optional[str]]:
+    """按游标获取帖子，返回 (帖子列表, 下一页游标)"""
+    query = db.query(Post).options(joinedload(Post.owner))
+    posts, next_cursor = keyset_page(query, [Post.created_at, Post.id], "posts", cursor, limit)
+    return apply_pending_counts(posts), next_cursor
+
+@read_only
+def get_post_rows(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """帖子列表的快速序列化版本：只查询帖子和作者需要的列，返回 (帖子字典列表, 下一页游标)"""
+    query = projections.project_posts(db.query(Post))
+    if cursor or skip == 0:
+        rows, next_cursor = keyset_page(query, [Post.created_at, Post.id], "posts", cursor, limit)
+    else:
+        rows = query.order_by(desc(Post.created_at), desc(Post.id)).offset(skip).limit(limit).all()
+        next_cursor = None
+    return projections.post_dicts(rows), next_cursor
 
 def get_post(db: Session, post_id: int) -> Optional[Post]:
     """获取特定帖子"""
@@ -36,7 +68,8 @@ def update_post(db: Session, post: Post, post_in: PostUpdate) -> Post:
 
 def delete_post(db: Session, post_id: int) -> bool:
     """删除帖子"""
-    post = db.query(Post).filter(Post.id == post_id).first()
+    # 调用方通常已加载过该帖子，直接从会话的标识映射中取得，不再重复查询
+    post = db.get(Post, post_id)
     if not post:
         return False
     
@@ -44,6 +77,7 @@ def delete_post(db: Session, post_id: int) -> bool:
     db.commit()
     return True
 
+@read_only
 def get_comments(db: Session, post_id: int, skip: int = 0, limit: int = 100) -> List[Comment]:
     """获取帖子的所有评论"""
     return db.query(Comment).filter(
@@ -51,8 +85,85 @@ def get_comments(db: Session, post_id: int, skip: int = 0, limit: int = 100) ->
         Comment.parent_id.is_(None)  # 只获取顶级评论
     ).order_by(Comment.created_at).offset(skip).limit(limit).all()
 
-def create_comment(db: Session, comment_in: CommentCreate, user_id: int) -> Comment:
-    """创建新评论"""
+def get_comment(db: Session, comment_id: int) -> Optional[Comment]:
+    """获取特定评论"""
+    return db.query(Comment).filter(Comment.id == comment_id).first()
+
+# 携带评论游标但未指定每页数量时的默认值
+COMMENT_PAGE_SIZE = 50
+
+@read_only
+def get_comment_tree(
+    db: Session, post_id: int, cursor: Optional[str] = None, limit: Optional[int] = None
+) -> Tuple[List[Comment], Optional[str]]:
+    """
+    获取帖子的评论树，返回 (顶级评论列表, 下一页游标)
+
+    每条评论的 replies 和 owner 都已填充，序列化时不会再触发查询。
+    不分页（limit 为空）时按 post_id 一次取出全部评论；分页时按 (created_at, id) 对顶级评论
+    做键集分页，再逐层按 parent_id 取出这些评论的回复（查询次数与回复层数有关，与评论数无关）。
+    作者统一批量查询。
+    """
+    order = [Comment.created_at, Comment.id]
+    if cursor and limit is None:
+        limit = COMMENT_PAGE_SIZE
+    if limit is None:
+        comments = db.query(Comment).filter(Comment.post_id == post_id).order_by(*order).all()
+        next_cursor = None
+    else:
+        roots_query = db.query(Comment).filter(Comment.post_id == post_id, Comment.parent_id.is_(None))
+        roots, next_cursor = keyset_page(roots_query, order, "comments", cursor, limit, descending=False)
+        comments = list(roots)
+        seen = {comment.id for comment in comments}
+        frontier = list(seen)
+        while frontier:
+            replies = db.query(Comment).filter(Comment.parent_id.in_(frontier)).order_by(*order).all()
+            replies = [reply for reply in replies if reply.id not in seen]
+            seen.update(reply.id for reply in replies)
+            comments.extend(replies)
+            frontier = [reply.id for reply in replies]
+    
+    # 批量加载作者
+    owner_ids = {comment.owner_id for comment in comments if comment.owner_id is not None}
+    owners = {user.id: user for user in db.query(User).filter(User.id.in_(owner_ids))} if owner_ids else {}
+    
+    # 按 parent_id 在内存中组装评论树（设置为已加载的值，不会被当作修改提交）
+    children = defaultdict(list)
+    for comment in comments:
+        children[comment.parent_id].append(comment)
+    for comment in comments:
+        set_committed_value(comment, "owner", owners.get(comment.owner_id))
+        set_committed_value(comment, "replies", children.get(comment.id, []))
+    return children.get(None, []), next_cursor
+
+@read_only
+def get_post_with_comments(
+    db: Session, post_id: int, comment_cursor: Optional[str] = None, comment_limit: Optional[int] = None
+) -> Tuple[Optional[Post], Optional[str]]:
+    """
+    获取帖子详情和评论树，返回 (帖子, 评论的下一页游标)；帖子的 comments 为顶级评论
+    """
+    post = db.query(Post).options(joinedload(Post.owner)).filter(Post.id == post_id).first()
+    if not post:
+        return None, None
+    comments, next_cursor = get_comment_tree(db, post_id, comment_cursor, comment_limit)
+    set_committed_value(post, "comments", comments)
+    apply_pending_counts([post])
+    return post, next_cursor
+
+def create_comment(db: Session, comment_in: CommentCreate, user_id: int) -> Optional[Comment]:
+    """
+    创建新评论，帖子不存在时返回 None
+
+    以原子的 UPDATE 增加帖子的评论计数，同时由影响行数判断帖子是否存在，不再预先查询帖子。
+    """
+    updated = db.query(Post).filter(Post.id == comment_in.post_id).update(
+        {Post.comment_count: func.coalesce(Post.comment_count, 0) + 1}, synchronize_session=False
+    )
+    if not updated:
+        db.rollback()
+        return None
+    
     comment = Comment(
         content=comment_in.content,
         owner_id=user_id,
@@ -60,47 +171,105 @@ def create_comment(db: Session, comment_in: CommentCreate, user_id: int) -> Comm
         parent_id=comment_in.parent_id
     )
     db.add(comment)
-    
-    # 更新帖子的评论计数
-    post = db.query(Post).filter(Post.id == comment_in.post_id).first()
-    if post:
-        post.comment_count += 1
-    
     db.commit()
     db.refresh(comment)
     return comment
 
+def _comment_subtree_levels(db: Session, comment_id: int) -> List[List[int]]:
+    """评论及其所有后代的 ID，按层级分组（第一层为该评论本身），每层一次查询"""
+    levels = [[comment_id]]
+    while True:
+        children = [
+            row.id for row in db.query(Comment.id).filter(Comment.parent_id.in_(levels[-1])).all()
+        ]
+        if not children:
+            return levels
+        levels.append(children)
+
 def delete_comment(db: Session, comment_id: int) -> bool:
-    """删除评论"""
-    comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    """
+    删除评论及其所有层级的回复
+
+    帖子评论计数按删除的评论总数（整棵子树）以原子的 UPDATE 减少，
+    删除从最深层开始，保证外键引用的父评论最后删除。
+    """
+    comment = db.get(Comment, comment_id)
     if not comment:
         return False
+    post_id = comment.post_id
     
-    # 更新帖子的评论计数 (减少主评论及其所有回复的数量)
-    post = db.query(Post).filter(Post.id == comment.post_id).first()
-    if post:
-        # 计算要删除的评论总数 (主评论+所有回复)
-        replies_count = db.query(Comment).filter(Comment.parent_id == comment_id).count()
-        post.comment_count -= (1 + replies_count)  # 主评论 + 回复数
+    levels = _comment_subtree_levels(db, comment_id)
+    deleted = 0
+    for ids in reversed(levels):
+        deleted += db.query(Comment).filter(Comment.id.in_(ids)).delete(synchronize_session=False)
     
-    db.delete(comment)
+    db.query(Post).filter(Post.id == post_id).update(
+        {Post.comment_count: func.coalesce(Post.comment_count, 0) - deleted}, synchronize_session=False
+    )
     db.commit()
     return True
 
-def increment_post_view(db: Session, post_id: int) -> Post:
-    """增加帖子浏览次数"""
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if post:
-        post.view_count += 1
+def reconcile_comment_counts(db: Session, batch_size: Optional[int] = None) -> int:
+    """
+    按评论表重新计算帖子的评论计数，返回修正的帖子数
+
+    按帖子 ID 分批执行，每批一条 UPDATE ... SET comment_count = (SELECT COUNT(*) ...)，
+    只更新计数与实际评论数不一致的帖子，每批单独提交以缩短锁持有时间。
+    """
+    batch_size = batch_size or settings.COMMENT_COUNT_RECONCILE_BATCH
+    actual = (
+        select(func.count(Comment.id))
+        .where(Comment.post_id == Post.id)
+        .correlate(Post)
+        .scalar_subquery()
+    )
+    fixed = 0
+    last_id = 0
+    while True:
+        ids = [
+            row.id for row in db.query(Post.id).filter(Post.id > last_id).order_by(Post.id).limit(batch_size).all()
+        ]
+        if not ids:
+            return fixed
+        fixed += db.query(Post).filter(
+            Post.id.between(ids[0], ids[-1]),
+            func.coalesce(Post.comment_count, -1) != actual
+        ).update({Post.comment_count: actual}, synchronize_session=False)
         db.commit()
-        db.refresh(post)
+        last_id = ids[-1]
+
+def apply_pending_counts(posts: List[Post]) -> List[Post]:
+    """合并尚未写回数据库的浏览/点赞增量"""
+    counters.counter_buffer.apply_pending(posts, ("view_count", "like_count"))
+    return posts
+
+def increment_post_view(db: Session, post: Post) -> Post:
+    """增加帖子浏览次数（post 为已加载并已合并待写增量的对象，计数同步更新）"""
+    counters.increment(db, Post, "view_count", post.id, target=post)
     return post
 
-def like_post(db: Session, post_id: int) -> Post:
-    """点赞帖子"""
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if post:
-        post.like_count += 1
-        db.commit()
-        db.refresh(post)
-    return post 
\ No newline at end of file
+def like_post(db: Session, post_id: int) -> bool:
+    """点赞帖子，存在性检查合并在计数更新语句中，帖子不存在时返回 False"""
+    return counters.increment(db, Post, "like_count", post_id)
+
+# 异步接口使用的版本，返回的对象已预加载序列化所需的关联数据
+
+async def get_posts_async(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Post]:
+    return await db.run_sync(get_posts, skip, limit)
+
+async def get_posts_by_cursor_async(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Post], Optional[str]]:
+    return await db.run_sync(get_posts_by_cursor, cursor, limit)
+
+async def get_post_rows_async(
+    db: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return await db.run_sync(get_post_rows, skip, limit, cursor)
+
+async def get_post_async(
+    db: AsyncSession, post_id: int, comment_cursor: Optional[str] = None, comment_limit: Optional[int] = None
+) -> Tuple[Optional[Post], Optional[str]]:
+    """获取帖子及其评论树（见 get_post_with_comments）"""
+    return await db.run_sync(get_post_with_comments, post_id, comment_cursor, comment_limit)
+
+async def increment_post_view_async(db: AsyncSession, post: Post) -> Post:
+    return await db.run_sync(increment_post_view, post)
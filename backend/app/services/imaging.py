@@ -0,0 +1,100 @@
+"""
+缩略图和预览图生成
+
+本模块在缩略图进程池的子进程中运行，不要在这里导入数据库或应用配置相关的模块。
+图片处理需要 Pillow；PDF 首页预览需要可选依赖 PyMuPDF。
+"""
+import io
+import os
+import uuid
+import zipfile
+from typing import List, Tuple
+
+from backend.app.core.previews import IMAGE_EXTENSIONS, OFFICE_EXTENSIONS, PDF_EXTENSIONS
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - 未安装 Pillow 时不生成缩略图
+    Image = None
+
+try:
+    import fitz
+except ImportError:  # pragma: no cover - 未安装 PyMuPDF 时不生成 PDF 预览
+    fitz = None
+
+# Office Open XML 文件中保存的首页缩略图
+_OFFICE_THUMBNAILS = ("docProps/thumbnail.jpeg", "docProps/thumbnail.jpg", "docProps/thumbnail.png")
+
+class UnsupportedPreview(Exception):
+    """无法为该文件生成缩略图"""
+
+def _open_source(path: str, extension: str, max_size: int):
+    if Image is None:
+        raise UnsupportedPreview("未安装 Pillow，无法生成缩略图")
+    extension = extension.lower()
+
+    if extension in IMAGE_EXTENSIONS:
+        image = Image.open(path)
+        # JPEG 可以在解码时直接缩小，避免解码整张大图
+        image.draft("RGB", (max_size, max_size))
+        return ImageOps.exif_transpose(image)
+
+    if extension in OFFICE_EXTENSIONS:
+        try:
+            with zipfile.ZipFile(path) as archive:
+                names = set(archive.namelist())
+                for name in _OFFICE_THUMBNAILS:
+                    if name in names:
+                        return Image.open(io.BytesIO(archive.read(name)))
+        except zipfile.BadZipFile:
+            raise UnsupportedPreview("文件已损坏或格式不正确")
+        raise UnsupportedPreview("文档中没有保存首页缩略图")
+
+    if extension in PDF_EXTENSIONS:
+        if fitz is None:
+            raise UnsupportedPreview("未安装 PyMuPDF，无法生成 PDF 预览")
+        with fitz.open(path) as document:
+            if document.page_count == 0:
+                raise UnsupportedPreview("PDF 没有页面")
+            page = document.load_page(0)
+            zoom = max_size / max(page.rect.width, page.rect.height)
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            return Image.open(io.BytesIO(pixmap.tobytes("png")))
+
+    raise UnsupportedPreview(f"不支持为 {extension} 文件生成缩略图")
+
+def _flatten(image):
+    """
+    转为 RGB，透明背景填充为白色
+    """
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+def render_derivatives(source: str, extension: str, outputs: List[Tuple[str, int]], quality: int = 82) -> List[str]:
+    """
+    生成缩略图，outputs 为 [(输出路径, 最长边像素)]，返回生成的文件路径
+
+    所有尺寸共用一次解码结果；输出先写临时文件再原子替换。
+    """
+    max_size = max(size for _, size in outputs)
+    try:
+        image = _flatten(_open_source(source, extension, max_size))
+    except UnsupportedPreview:
+        raise
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise UnsupportedPreview(f"无法读取图片: {e}")
+
+    written = []
+    for path, size in sorted(outputs, key=lambda output: -output[1]):
+        # 从大到小依次缩放，小尺寸基于上一次的结果，减少重采样的像素量
+        image.thumbnail((size, size), Image.LANCZOS)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{uuid.uuid4().hex}.part"
+        image.save(temp, "JPEG", quality=quality, optimize=True, progressive=True)
+        os.replace(temp, path)
+        written.append(path)
+    return written
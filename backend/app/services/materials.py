@@ -1,9 +1,18 @@
-from typing import List, Dict, Any, Optional
-from sqlalchemy import or_, func
-from sqlalchemy.orm import Session, joinedload
+import os
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import or_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from backend.app.core.config import settings
+from backend.app.db.pagination import keyset_page
+from backend.app.db.routing import read_only
 from backend.app.models.material import Material
 from backend.app.models.tag import Tag
 from backend.app.schemas.material import MaterialCreate, MaterialUpdate
+from backend.app.services import counters, projections, storage
+from backend.app.services.derivatives import derivative_generator, derivative_key, remove_derivatives
+from backend.app.services.extraction import PENDING, extraction_queue, needs_extraction
+from backend.app.services.search_index import get_search_backend, INDEXED_FIELDS
 
 def get_material(db: Session, material_id: int) -> Optional[Material]:
     """
@@ -11,16 +20,7 @@ def get_material(db: Session, material_id: int) -> Optional[Material]:
     """
     return db.query(Material).filter(Material.id == material_id).first()
 
-def get_materials(
-    db: Session, 
-    user_id: int, 
-    skip: int = 0, 
-    limit: int = 100,
-    is_public: Optional[bool] = None
-) -> List[Material]:
-    """
-    获取资料列表
-    """
+def _visible_materials_query(db: Session, user_id: int, is_public: Optional[bool] = None):
     query = db.query(Material).filter(
         or_(
             Material.owner_id == user_id,
@@ -31,16 +31,77 @@ def get_materials(
     if is_public is not None:
         query = query.filter(Material.is_public == is_public)
     
-    return query.order_by(Material.created_at.desc()).offset(skip).limit(limit).all()
+    return query
+
+@read_only
+def get_materials(
+    db: Session, 
+    user_id: int, 
+    skip: int = 0, 
+    limit: int = 100,
+    is_public: Optional[bool] = None
+) -> List[Material]:
+    """
+    获取资料列表
+    """
+    query = _visible_materials_query(db, user_id, is_public)
+    materials = query.order_by(Material.created_at.desc(), Material.id.desc()).offset(skip).limit(limit).all()
+    return apply_pending_counts(materials)
+
+@read_only
+def get_materials_by_cursor(
+    db: Session, 
+    user_id: int, 
+    cursor: Optional[str] = None, 
+    limit: int = 100,
+    is_public: Optional[bool] = None
+) -> Tuple[List[Material], Optional[str]]:
+    """
+    按游标获取资料列表，返回 (资料列表, 下一页游标)
+    """
+    query = _visible_materials_query(db, user_id, is_public)
+    materials, next_cursor = keyset_page(query, [Material.created_at, Material.id], "materials", cursor, limit)
+    return apply_pending_counts(materials), next_cursor
+
+@read_only
+def get_material_rows(
+    db: Session, 
+    user_id: int, 
+    skip: int = 0, 
+    limit: int = 100,
+    is_public: Optional[bool] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    资料列表的快速序列化版本：只查询列表需要的列，返回 (资料字典列表, 下一页游标)
+
+    分页方式与 get_materials_by_cursor / get_materials 相同（首页或携带 cursor 时使用游标）。
+    """
+    query = _visible_materials_query(db, user_id, is_public).with_entities(*projections.MATERIAL_COLUMNS)
+    if cursor or skip == 0:
+        rows, next_cursor = keyset_page(query, [Material.created_at, Material.id], "materials", cursor, limit)
+    else:
+        rows = query.order_by(Material.created_at.desc(), Material.id.desc()).offset(skip).limit(limit).all()
+        next_cursor = None
+    return projections.material_dicts(rows), next_cursor
 
 def create_material(
     db: Session, 
     material_in: MaterialCreate, 
     user_id: int,
-    file_path: Optional[str] = None
+    file_path: Optional[str] = None,
+    file_size: Optional[int] = None,
+    file_hash: Optional[str] = None,
+    file_name: Optional[str] = None,
+    source_path: Optional[str] = None
 ) -> Material:
     """
     创建新资料
+    
+    file_hash 对应内容寻址存储中的文件，创建资料时增加其引用计数；
+    source_path 为已写好的临时文件，存储中没有该文件时移入存储，否则丢弃。
+    未提供 source_path 而文件已被删除时抛出 storage.BlobMissingError（事务已回滚）。
+    可提取文本的文档加入后台提取队列，提取结果写入 content
     """
     material = Material(
         title=material_in.title,
@@ -48,12 +109,23 @@ def create_material(
         content=material_in.content,
         file_path=file_path,
         file_type=material_in.file_type,
+        file_size=file_size,
+        file_hash=file_hash,
+        file_name=file_name,
         owner_id=user_id,
         mindmap_id=material_in.mindmap_id,
-        is_public=material_in.is_public
+        is_public=material_in.is_public,
+        extraction_status=PENDING if file_path and needs_extraction(file_name or file_path) else None
     )
     
     db.add(material)
+    if file_hash:
+        # 先取得引用再处理文件，避免并发删除最后一个引用时删掉刚复用的文件
+        try:
+            storage.acquire_blob(db, file_hash, file_size or 0, source_path)
+        except storage.BlobMissingError:
+            db.rollback()
+            raise
     db.commit()
     db.refresh(material)
     
@@ -63,9 +135,16 @@ def create_material(
             tag = db.query(Tag).filter(Tag.id == tag_id).first()
             if tag:
                 material.tags.append(tag)
-        
-        db.commit()
-        db.refresh(material)
+    
+    # 写入搜索索引
+    get_search_backend().index_material(db, material)
+    
+    db.commit()
+    db.refresh(material)
+    
+    if material.extraction_status == PENDING:
+        extraction_queue.enqueue(material.id)
+    derivative_generator.submit(material)
     
     return material
 
@@ -94,22 +173,38 @@ def update_material(
     for field, value in update_data.items():
         setattr(material, field, value)
     
+    # 索引字段有变化时重建该资料的搜索索引
+    if any(field in update_data for field in INDEXED_FIELDS):
+        get_search_backend().index_material(db, material)
+    
     db.commit()
     db.refresh(material)
     return material
 
 def delete_material(db: Session, material_id: int) -> bool:
     """
-    删除资料
+    删除资料及其文件（内容寻址存储中的文件在最后一个引用删除时才删除）
     """
-    material = db.query(Material).filter(Material.id == material_id).first()
+    # 调用方通常已加载过该资料，直接从会话的标识映射中取得，不再重复查询
+    material = db.get(Material, material_id)
     if not material:
         return False
     
+    get_search_backend().remove_material(db, material_id)
+    unreferenced = storage.release_blob(db, material.file_hash) if material.file_hash else False
     db.delete(material)
     db.commit()
+    
+    if unreferenced and storage.remove_blob(db, material.file_hash):
+        remove_derivatives(material.file_hash)
+    elif not material.file_hash and material.file_path:
+        # 内容寻址存储之前上传的文件
+        if os.path.exists(material.file_path):
+            os.remove(material.file_path)
+        remove_derivatives(derivative_key(material))
     return True
 
+@read_only
 def get_materials_by_tags(
     db: Session, 
     user_id: int, 
@@ -137,20 +232,81 @@ def get_materials_by_tags(
     
     return materials
 
+def apply_pending_counts(materials: List[Material]) -> List[Material]:
+    """
+    合并尚未写回数据库的浏览/点赞增量
+    """
+    counters.counter_buffer.apply_pending(materials, ("view_count", "like_count"))
+    return materials
+
 def increment_view_count(db: Session, material: Material) -> Material:
     """
-    增加资料浏览次数
+    增加资料浏览次数（material 为已加载并已合并待写增量的对象，计数同步更新）
     """
-    material.view_count += 1
-    db.commit()
-    db.refresh(material)
+    counters.increment(db, Material, "view_count", material.id, target=material)
     return material
 
 def increment_like_count(db: Session, material: Material) -> Material:
     """
     增加资料点赞次数
     """
-    material.like_count += 1
-    db.commit()
-    db.refresh(material)
-    return material 
\ No newline at end of file
+    counters.increment(db, Material, "like_count", material.id, target=material)
+    return material
+
+def like_material(db: Session, material_id: int, user_id: int) -> bool:
+    """
+    点赞资料：只有公开资料或用户自己的资料可以点赞
+
+    存在性和权限条件合并在计数更新语句中，资料不存在或无权访问时返回 False。
+    """
+    return counters.increment(
+        db, Material, "like_count", material_id,
+        criteria=[or_(Material.owner_id == user_id, Material.is_public == True)]
+    )
+
+# 异步接口使用的版本：等待数据库时不占用线程池。
+# 列表查询通过 run_sync 在 AsyncSession 的连接上复用同步实现；
+# 返回的对象需要的关联数据都已预加载，可以在会话之外序列化。
+
+async def get_material_async(db: AsyncSession, material_id: int) -> Optional[Material]:
+    """
+    获取资料详情（预加载标签）
+    """
+    result = await db.execute(
+        select(Material).options(selectinload(Material.tags)).where(Material.id == material_id)
+    )
+    material = result.scalar_one_or_none()
+    if material:
+        apply_pending_counts([material])
+    return material
+
+async def get_materials_async(
+    db: AsyncSession, 
+    user_id: int, 
+    skip: int = 0, 
+    limit: int = 100,
+    is_public: Optional[bool] = None
+) -> List[Material]:
+    return await db.run_sync(get_materials, user_id, skip, limit, is_public)
+
+async def get_materials_by_cursor_async(
+    db: AsyncSession, 
+    user_id: int, 
+    cursor: Optional[str] = None, 
+    limit: int = 100,
+    is_public: Optional[bool] = None
+) -> Tuple[List[Material], Optional[str]]:
+    return await db.run_sync(get_materials_by_cursor, user_id, cursor, limit, is_public)
+
+async def get_material_rows_async(
+    db: AsyncSession, 
+    user_id: int, 
+    skip: int = 0, 
+    limit: int = 100,
+    is_public: Optional[bool] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return await db.run_sync(get_material_rows, user_id, skip, limit, is_public, cursor)
+
+async def increment_view_count_async(db: AsyncSession, material: Material) -> Material:
+    return await db.run_sync(increment_view_count, material) 
\ No newline at end of file
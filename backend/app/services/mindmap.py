@@ -1,6 +1,7 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import json
 from sqlalchemy.orm import Session
+from backend.app.db.pagination import keyset_page
 from backend.app.models.mindmap import MindMap
 from backend.app.models.tag import Tag
 from backend.app.schemas.mindmap import MindMapCreate, MindMapUpdate
@@ -12,7 +13,16 @@ def get_mindmap(db: Session, mindmap_id: int) -> Optional[MindMap]:
 
 def get_user_mindmaps(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[MindMap]:
     """获取用户的所有思维导图"""
-    return db.query(MindMap).filter(MindMap.owner_id == user_id).offset(skip).limit(limit).all()
+    return db.query(MindMap).filter(
+        MindMap.user_id == user_id
+    ).order_by(MindMap.created_at.desc(), MindMap.id.desc()).offset(skip).limit(limit).all()
+
+def get_user_mindmaps_by_cursor(
+    db: Session, user_id: int, cursor: Optional[str] = None, limit: int = 100
+) -> Tuple[List[MindMap], Optional[str]]:
+    """按游标获取用户的思维导图，返回 (思维导图列表, 下一页游标)"""
+    query = db.query(MindMap).filter(MindMap.user_id == user_id)
+    return keyset_page(query, [MindMap.created_at, MindMap.id], "mindmaps", cursor, limit)
 
 def create_mindmap(db: Session, mindmap_in: MindMapCreate, user_id: int) -> MindMap:
     """创建新思维导图"""
@@ -0,0 +1,70 @@
+"""
+列表接口的快速序列化
+
+只查询响应模型需要的列（不读取正文等大字段），直接构造字典交给 FastJSONResponse 编码，
+跳过 ORM 对象构造和 response_model 校验。字段与对应的响应模型保持一致。
+"""
+from typing import Any, Dict, List
+
+from sqlalchemy.orm import Query
+
+from backend.app.models.forum import Post
+from backend.app.models.material import Material
+from backend.app.models.user import User
+from backend.app.schemas.forum import Post as PostSchema
+from backend.app.schemas.material import Material as MaterialSchema, thumbnail_url
+from backend.app.schemas.user import User as UserSchema
+from backend.app.services.counters import counter_buffer
+
+# 由模型属性计算、不对应数据库列的字段
+_MATERIAL_COMPUTED = ("thumbnail_url", "preview_url")
+
+MATERIAL_FIELDS = tuple(field for field in MaterialSchema.model_fields if field not in _MATERIAL_COMPUTED)
+# 计算缩略图地址还需要文件哈希
+MATERIAL_COLUMNS = [getattr(Material, field) for field in MATERIAL_FIELDS] + [Material.file_hash]
+
+POST_FIELDS = tuple(field for field in PostSchema.model_fields if field != "owner")
+POST_OWNER_FIELDS = tuple(UserSchema.model_fields)
+POST_COLUMNS = [getattr(Post, field) for field in POST_FIELDS] + [
+    getattr(User, field).label(f"owner_{field}") for field in POST_OWNER_FIELDS
+]
+
+_COUNT_FIELDS = ("view_count", "like_count")
+
+def _with_pending_counts(item: Dict[str, Any], model) -> Dict[str, Any]:
+    for field in _COUNT_FIELDS:
+        delta = counter_buffer.pending(model, field, item["id"])
+        if delta:
+            item[field] = (item[field] or 0) + delta
+    return item
+
+def material_dict(row) -> Dict[str, Any]:
+    """
+    将 MATERIAL_COLUMNS 查询结果行（或资料对象）转换为与 schemas.material.Material 相同的字典
+    """
+    item = {field: getattr(row, field) for field in MATERIAL_FIELDS}
+    item["thumbnail_url"] = thumbnail_url(row, "thumbnail")
+    item["preview_url"] = thumbnail_url(row, "preview")
+    return _with_pending_counts(item, Material)
+
+def project_posts(query: Query) -> Query:
+    """
+    帖子查询只读取 POST_COLUMNS（连接作者）
+    """
+    return query.outerjoin(Post.owner).with_entities(*POST_COLUMNS)
+
+def post_dict(row) -> Dict[str, Any]:
+    """
+    将 POST_COLUMNS 查询结果行转换为与 schemas.forum.Post 相同的字典
+    """
+    item = {field: getattr(row, field) for field in POST_FIELDS}
+    item["owner"] = None if row.owner_id is None else {
+        field: getattr(row, f"owner_{field}") for field in POST_OWNER_FIELDS
+    }
+    return _with_pending_counts(item, Post)
+
+def material_dicts(rows) -> List[Dict[str, Any]]:
+    return [material_dict(row) for row in rows]
+
+def post_dicts(rows) -> List[Dict[str, Any]]:
+    return [post_dict(row) for row in rows]
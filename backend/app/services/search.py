@@ -1,12 +1,61 @@
-from typing import List, Dict, Any, Optional
+import json
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
-from sqlalchemy import or_, func, desc
-from sqlalchemy.orm import Session, joinedload
-from backend.app.models.material import Material
+from sqlalchemy import or_, func, desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, Query, joinedload, selectinload
+from backend.app.core.cache import TTLCache
+from backend.app.core.config import settings
+from backend.app.db.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_page
+from backend.app.db.routing import read_only
+from backend.app.models.material import Material, material_tag
 from backend.app.models.mindmap import MindMap
 from backend.app.models.tag import Tag
 from backend.app.models.user_activity import SearchHistory
+from backend.app.services.counters import counter_buffer
+from backend.app.services.search_index import get_search_backend
+from backend.app.services.tags import subtree_tag_ids
 
+# 总数统计方式：auto - 小结果集精确统计、大结果集使用缓存或估算；exact - 精确统计；none - 不统计
+COUNT_MODES = ("auto", "exact", "none")
+
+# 大结果集的总数缓存（键为用户、查询词和过滤条件）
+_count_cache = TTLCache(maxsize=4096, ttl=settings.SEARCH_COUNT_CACHE_TTL)
+
+def _count_total(
+    db: Session,
+    base_query: Query,
+    user_id: int,
+    query: str,
+    filters: Optional[Dict[str, Any]],
+    count: str
+) -> Tuple[Optional[int], bool]:
+    """
+    按统计方式计算搜索结果总数，返回 (总数, 是否精确)
+    """
+    if count == "none":
+        return None, False
+    if count == "exact":
+        return base_query.count(), True
+    
+    # 最多数到阈值+1行，未超过阈值即为精确总数
+    threshold = settings.SEARCH_EXACT_COUNT_THRESHOLD
+    bounded = base_query.with_entities(Material.id).limit(threshold + 1).subquery()
+    total = db.query(func.count()).select_from(bounded).scalar()
+    if total <= threshold:
+        return total, True
+    
+    cache_key = (user_id, query, json.dumps(filters or {}, sort_keys=True, default=str))
+    cached = _count_cache.get(cache_key)
+    if cached is not None:
+        return cached, False
+    
+    estimate = get_search_backend().estimate_matches(db, query) if query else None
+    total = max(estimate or 0, threshold + 1)
+    _count_cache.set(cache_key, total)
+    return total, False
+
+@read_only
 def search_by_keyword(
     db: Session, 
     user_id: int, 
@@ -14,10 +63,17 @@ def search_by_keyword(
     filters: Dict[str, Any] = None, 
     sort_by: str = "relevance", 
     page: int = 1, 
-    limit: int = 10
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    count: str = "auto",
+    columns: Optional[List[Any]] = None
 ):
     """
     关键词搜索服务
+    
+    传入 cursor 时忽略 page，从游标位置继续；结果中的 next_cursor 用于获取下一页。
+    count 为总数统计方式（见 COUNT_MODES），total_exact 表示总数是否精确。
+    传入 columns 时只查询这些列，items 为结果行而不是资料对象（快速序列化使用）。
     """
     # 基础查询 - 只查询公开资料和用户自己的资料
     base_query = db.query(Material).filter(
@@ -27,16 +83,11 @@ def search_by_keyword(
         )
     )
     
-    # 关键词搜索
+    # 关键词搜索（由搜索后端给出匹配条件，默认走倒排索引）
     if query:
-        search_terms = [f"%{term}%" for term in query.split()]
-        search_conditions = []
-        for term in search_terms:
-            search_conditions.append(Material.title.ilike(term))
-            search_conditions.append(Material.description.ilike(term))
-            search_conditions.append(Material.content.ilike(term))
-        
-        base_query = base_query.filter(or_(*search_conditions))
+        match_condition = get_search_backend().match_condition(db, query)
+        if match_condition is not None:
+            base_query = base_query.filter(match_condition)
     
     # 应用过滤器
     if filters:
@@ -54,32 +105,75 @@ def search_by_keyword(
             date_to = datetime.fromisoformat(filters["date_to"])
             base_query = base_query.filter(Material.created_at <= date_to)
     
-    # 计算总数
-    total = base_query.count()
+    offset = 0 if cursor else (page - 1) * limit
+    next_cursor = None
     
-    # 排序
-    if sort_by == "newest":
-        base_query = base_query.order_by(desc(Material.created_at))
-    elif sort_by == "popularity":
-        base_query = base_query.order_by(desc(Material.view_count), desc(Material.like_count))
-    else:  # relevance - 默认排序
-        # 对于相关性排序，可以根据匹配度来排序
-        # 这里简化处理，仍按创建时间排序
-        base_query = base_query.order_by(desc(Material.created_at))
+    # 相关性排序：由搜索后端按BM25打分，只取前 offset+limit+1 条
+    ranked = None
+    if sort_by not in ("newest", "popularity") and query:
+        after = None
+        if cursor:
+            after = decode_cursor(cursor, "relevance")
+            if len(after) != 2:
+                raise InvalidCursorError("无效的分页游标")
+        candidates = base_query.with_entities(Material.id).statement
+        ranked = get_search_backend().rank(
+            db, query, candidates, offset + limit + 1, after=tuple(after) if after else None
+        )
     
-    # 分页
-    offset = (page - 1) * limit
-    items = base_query.offset(offset).limit(limit).all()
+    if ranked is not None:
+        # 打分时遍历了全部匹配结果则总数精确，提前终止时按统计方式计算
+        total, top = ranked
+        total_exact = True
+        if total is None:
+            total, total_exact = _count_total(db, base_query, user_id, query, filters, count)
+        page_hits = top[offset:offset + limit]
+        if len(top) > offset + limit:
+            last_id, last_score = page_hits[-1]
+            next_cursor = encode_cursor("relevance", [last_score, last_id])
+        page_ids = [material_id for material_id, _ in page_hits]
+        items_query = db.query(*columns) if columns else db.query(Material)
+        materials_by_id = {
+            material.id: material
+            for material in items_query.filter(Material.id.in_(page_ids))
+        } if page_ids else {}
+        items = [materials_by_id[material_id] for material_id in page_ids if material_id in materials_by_id]
+    else:
+        # 计算总数
+        total, total_exact = _count_total(db, base_query, user_id, query, filters, count)
+        
+        # 排序（后端不支持相关性打分时按创建时间排序）
+        if sort_by == "popularity":
+            sort_key, sort_columns = "popularity", [Material.view_count, Material.like_count, Material.id]
+        else:
+            sort_key, sort_columns = "newest", [Material.created_at, Material.id]
+        
+        if columns:
+            base_query = base_query.with_entities(*columns)
+        
+        # 分页：首页和游标翻页走键集分页，指定页码时兼容旧的 offset 分页
+        if cursor or page == 1:
+            items, next_cursor = keyset_page(base_query, sort_columns, sort_key, cursor, limit)
+        else:
+            base_query = base_query.order_by(*[desc(column) for column in sort_columns])
+            items = base_query.offset(offset).limit(limit).all()
+    
+    # 合并尚未写回的浏览/点赞增量（与资料列表一致；按列查询的结果由调用方合并）
+    if not columns:
+        counter_buffer.apply_pending(items, ("view_count", "like_count"))
     
     # 构建返回结果
     return {
         "total": total,
+        "total_exact": total_exact,
         "items": items,
         "page": page,
         "limit": limit,
-        "query": query
+        "query": query,
+        "next_cursor": next_cursor
     }
 
+@read_only
 def search_by_mindmap(
     db: Session, 
     user_id: int, 
@@ -91,64 +185,64 @@ def search_by_mindmap(
 ):
     """
     思维导图搜索服务
+    
+    每页固定查询次数：总数、当前页思维导图（预加载标签）、相关标签、共享的资料列表
     """
     # 查找标签关联的思维导图
     mindmaps_query = db.query(MindMap).filter(
-        MindMap.owner_id == user_id
+        MindMap.user_id == user_id
     ).join(MindMap.tags).filter(
         Tag.id.in_(tag_ids)
     ).distinct()
     
-    # 获取相关标签
-    related_tags_query = db.query(Tag).filter(
-        Tag.id.in_(
-            db.query(Tag.id).join(
-                Tag.mindmaps
-            ).filter(
-                MindMap.id.in_([m.id for m in mindmaps_query])
-            )
-        )
-    )
+    # 获取相关标签（以子查询限定思维导图范围，不在Python中展开ID列表）
+    mindmap_ids = mindmaps_query.with_entities(MindMap.id).subquery()
+    related_tags_query = db.query(Tag).join(Tag.mindmaps).filter(
+        MindMap.id.in_(select(mindmap_ids.c.id))
+    ).distinct()
     related_tags = [{"id": tag.id, "name": tag.name, "color": tag.color} for tag in related_tags_query]
     
     # 分页
     total = mindmaps_query.count()
     offset = (page - 1) * limit
-    mindmaps = mindmaps_query.offset(offset).limit(limit).all()
+    mindmaps = mindmaps_query.options(
+        selectinload(MindMap.tags)
+    ).order_by(desc(MindMap.created_at), desc(MindMap.id)).offset(offset).limit(limit).all()
     
-    # 构建每个思维导图的数据
-    mindmap_items = []
-    for mindmap in mindmaps:
-        # 根据标签查找相关资料
-        materials = db.query(Material).join(
-            Material.tags
-        ).filter(
-            Tag.id.in_(tag_ids),
+    # 相关资料只取决于标签和过滤条件，整页共享一次查询，过滤条件下推到SQL
+    materials = []
+    if mindmaps:
+        materials_query = db.query(Material).filter(
+            # 标签下的资料包括其所有后代标签下的资料（按闭包表一次查询）
+            Material.id.in_(
+                select(material_tag.c.material_id).where(material_tag.c.tag_id.in_(subtree_tag_ids(tag_ids)))
+            ),
             or_(
                 Material.owner_id == user_id,
                 Material.is_public == True
             )
-        ).distinct().all()
-        
-        # 过滤资料
+        )
         if filters:
             if filters.get("file_type"):
-                materials = [m for m in materials if m.file_type == filters["file_type"]]
+                materials_query = materials_query.filter(Material.file_type == filters["file_type"])
             
             if filters.get("date_from"):
                 date_from = datetime.fromisoformat(filters["date_from"])
-                materials = [m for m in materials if m.created_at >= date_from]
+                materials_query = materials_query.filter(Material.created_at >= date_from)
             
             if filters.get("date_to"):
                 date_to = datetime.fromisoformat(filters["date_to"])
-                materials = [m for m in materials if m.created_at <= date_to]
-        
-        # 添加到结果中
+                materials_query = materials_query.filter(Material.created_at <= date_to)
+        materials = materials_query.all()
+    
+    # 构建每个思维导图的数据
+    mindmap_items = []
+    for mindmap in mindmaps:
         mindmap_items.append({
             "id": mindmap.id,
             "title": mindmap.title,
             "description": mindmap.description,
-            "owner_id": mindmap.owner_id,
+            "owner_id": mindmap.user_id,
             "created_at": mindmap.created_at,
             "updated_at": mindmap.updated_at,
             "tags": [{"id": tag.id, "name": tag.name, "color": tag.color} for tag in mindmap.tags],
@@ -179,6 +273,7 @@ def add_search_history(db: Session, user_id: int, query: str, search_type: str =
     db.refresh(history)
     return history
 
+@read_only
 def get_user_search_history(db: Session, user_id: int, limit: int = 10):
     """
     获取用户搜索历史
@@ -201,4 +296,10 @@ def get_tag_names(db: Session, tag_ids: List[int]) -> List[str]:
     根据标签ID获取标签名称
     """
     tags = db.query(Tag).filter(Tag.id.in_(tag_ids)).all()
-    return [tag.name for tag in tags] 
\ No newline at end of file
+    return [tag.name for tag in tags] 
+
+# 异步接口使用的版本：在 AsyncSession 的连接上执行同步实现，等待数据库时不占用线程池
+# 关键词搜索的 BM25 打分在 Python 中逐行计算，不适合在事件循环上执行，接口保持同步（线程池）
+
+async def get_user_search_history_async(db: AsyncSession, user_id: int, limit: int = 10):
+    return await db.run_sync(get_user_search_history, user_id, limit)
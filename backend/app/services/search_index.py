@@ -0,0 +1,516 @@
+import math
+import time
+import heapq
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import or_, select, false, func, case
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.models.material import Material
+from backend.app.models.search_index import SearchPosting, SearchTerm, SearchDocument
+from backend.app.services.tokenizer import tokenize, tokenize_query
+
+logger = logging.getLogger(__name__)
+
+# 参与索引的资料字段
+INDEXED_FIELDS = ("title", "description", "content")
+# 重建索引时每批处理的资料数量
+REBUILD_BATCH_SIZE = 500
+# 语料统计（资料总数、平均字段长度）的缓存时间（秒）
+CORPUS_STATS_TTL = 60
+# 打分提前终止后按资料ID点查倒排记录时每批的资料数量
+RANK_LOOKUP_BATCH_SIZE = 500
+
+def analyze_query(query: str) -> List[str]:
+    """
+    将查询字符串切分为去重后的词项（保持原有顺序）
+    """
+    terms = []
+    for clause in tokenize_query(query):
+        terms.extend(clause)
+    return list(dict.fromkeys(terms))
+
+def analyze_material(material: Material) -> Dict[str, List[str]]:
+    """
+    对资料的各索引字段分词
+    """
+    return {field: tokenize(getattr(material, field)) for field in INDEXED_FIELDS}
+
+class SearchBackend:
+    """
+    搜索后端基类
+
+    资料服务在增删改资料时调用 index_material / remove_material，
+    搜索服务通过 match_condition 获取限定 Material 的查询条件，
+    通过 rank 获取按相关性排序的结果（不支持时返回 None）。
+    """
+    name = "base"
+
+    def index_material(self, db: Session, material: Material) -> None:
+        raise NotImplementedError
+
+    def remove_material(self, db: Session, material_id: int) -> None:
+        raise NotImplementedError
+
+    def rebuild(self, db: Session) -> int:
+        raise NotImplementedError
+
+    def match_condition(self, db: Session, query: str):
+        raise NotImplementedError
+
+    def rank(
+        self, db: Session, query: str, candidates, top_k: int, after: Optional[Tuple[float, int]] = None
+    ) -> Optional[Tuple[int, List[Tuple[int, float]]]]:
+        return None
+
+    def estimate_matches(self, db: Session, query: str) -> Optional[int]:
+        return None
+
+class LikeSearchBackend(SearchBackend):
+    """
+    基于 ILIKE 的后端（旧实现），每次搜索扫描整张资料表，仅作回退使用
+    """
+    name = "like"
+
+    def index_material(self, db: Session, material: Material) -> None:
+        pass
+
+    def remove_material(self, db: Session, material_id: int) -> None:
+        pass
+
+    def rebuild(self, db: Session) -> int:
+        return 0
+
+    def match_condition(self, db: Session, query: str):
+        conditions = []
+        for term in query.split():
+            pattern = f"%{term}%"
+            conditions.append(Material.title.ilike(pattern))
+            conditions.append(Material.description.ilike(pattern))
+            conditions.append(Material.content.ilike(pattern))
+        return or_(*conditions) if conditions else None
+
+class InvertedIndexBackend(SearchBackend):
+    """
+    基于 search_postings 倒排表的后端，按词项走索引查找候选资料，
+    并使用预计算的词项统计（search_terms / search_documents）做 BM25 排序
+    """
+    name = "inverted_index"
+
+    def __init__(self):
+        self._corpus_stats = None
+        self._corpus_stats_expires_at = 0.0
+
+    def index_material(self, db: Session, material: Material) -> None:
+        """
+        重建单个资料的倒排记录和统计（不提交事务，由调用方提交）
+        """
+        field_tokens = analyze_material(material)
+        max_frequencies = self._max_term_frequencies(field_tokens)
+        old_terms = self._indexed_terms(db, material.id)
+
+        self._delete_postings(db, material.id)
+        db.add_all(self._build_postings(material.id, field_tokens))
+        db.merge(self._build_document(material.id, field_tokens))
+
+        self._decrement_document_frequency(db, old_terms - set(max_frequencies))
+        if max_frequencies:
+            self._upsert_terms(db, [
+                {
+                    "term": term,
+                    "document_frequency": 0 if term in old_terms else 1,
+                    "max_term_frequency": frequency
+                }
+                for term, frequency in max_frequencies.items()
+            ])
+
+    def remove_material(self, db: Session, material_id: int) -> None:
+        old_terms = self._indexed_terms(db, material_id)
+        self._delete_postings(db, material_id)
+        db.query(SearchDocument).filter(
+            SearchDocument.material_id == material_id
+        ).delete(synchronize_session=False)
+        self._decrement_document_frequency(db, old_terms)
+
+    def rebuild(self, db: Session) -> int:
+        """
+        清空并重建全部倒排索引和统计，返回处理的资料数量
+        """
+        db.query(SearchPosting).delete(synchronize_session=False)
+        db.query(SearchDocument).delete(synchronize_session=False)
+        db.query(SearchTerm).delete(synchronize_session=False)
+
+        document_frequency = Counter()
+        max_frequency = Counter()
+        count = 0
+        last_id = 0
+        while True:
+            batch = db.query(Material).filter(
+                Material.id > last_id
+            ).order_by(Material.id).limit(REBUILD_BATCH_SIZE).all()
+            if not batch:
+                break
+            for material in batch:
+                field_tokens = analyze_material(material)
+                db.add_all(self._build_postings(material.id, field_tokens))
+                db.add(self._build_document(material.id, field_tokens))
+                for term, frequency in self._max_term_frequencies(field_tokens).items():
+                    document_frequency[term] += 1
+                    max_frequency[term] = max(max_frequency[term], frequency)
+            db.flush()
+            last_id = batch[-1].id
+            count += len(batch)
+
+        db.add_all(
+            SearchTerm(term=term, document_frequency=frequency, max_term_frequency=max_frequency[term])
+            for term, frequency in document_frequency.items()
+        )
+        db.commit()
+        self._corpus_stats = None
+        return count
+
+    def match_condition(self, db: Session, query: str):
+        """
+        查询中任一片段命中即匹配；一个片段拆出的多个词项（中文三元组）需全部命中
+        """
+        conditions = []
+        for clause in tokenize_query(query):
+            postings = select(SearchPosting.material_id).where(SearchPosting.term.in_(clause))
+            if len(clause) > 1:
+                postings = postings.group_by(SearchPosting.material_id).having(
+                    func.count(func.distinct(SearchPosting.term)) == len(clause)
+                )
+            conditions.append(Material.id.in_(postings))
+        return or_(*conditions) if conditions else false()
+
+    def rank(
+        self, db: Session, query: str, candidates, top_k: int, after: Optional[Tuple[float, int]] = None
+    ) -> Optional[Tuple[Optional[int], List[Tuple[int, float]]]]:
+        """
+        BM25F 相关性打分（MaxScore 提前终止）
+
+        每个词项的得分上界由 search_terms 中的最大词频算出。按上界从大到小逐个读取词项的倒排记录
+        （限定在 candidates 子查询内的资料）并累加得分；剩余词项的上界之和低于当前第 top_k 名的得分时，
+        未出现过的资料不可能进入前 top_k 条，剩余词项只按仍有机会的资料ID点查倒排记录。
+        after 为上一页最后一条的 (得分, 资料ID)，只返回排在其后的结果，已排在其前的资料在打分过程中丢弃。
+        返回 (匹配总数, [(资料ID, 得分), ...])；提前终止时未遍历全部匹配结果，匹配总数为 None。
+        """
+        terms = analyze_query(query)
+        if not terms:
+            return 0, []
+
+        document_count, average_lengths = self._get_corpus_stats(db)
+        idf = {}
+        bounds = {}
+        for term, frequency, max_frequency in db.query(
+            SearchTerm.term, SearchTerm.document_frequency, SearchTerm.max_term_frequency
+        ).filter(SearchTerm.term.in_(terms)):
+            idf[term] = self._idf(document_count, frequency)
+            bounds[term] = self._score_bound(idf[term], max_frequency, average_lengths)
+
+        # 不在 search_terms 中的词项没有倒排记录
+        terms = sorted(bounds, key=lambda term: bounds[term], reverse=True)
+        scores = defaultdict(float)
+        passed = set()
+        pruned = False
+        for index, term in enumerate(terms):
+            remaining = sum(bounds[other] for other in terms[index + 1:])
+            if pruned:
+                term_scores = {}
+                material_ids = list(scores)
+                for offset in range(0, len(material_ids), RANK_LOOKUP_BATCH_SIZE):
+                    batch = material_ids[offset:offset + RANK_LOOKUP_BATCH_SIZE]
+                    term_scores.update(self._term_scores(
+                        db, term, idf[term], average_lengths, SearchPosting.material_id.in_(batch)
+                    ))
+            else:
+                term_scores = self._term_scores(
+                    db, term, idf[term], average_lengths, SearchPosting.material_id.in_(candidates)
+                )
+
+            for material_id, score in term_scores.items():
+                if material_id in passed:
+                    continue
+                scores[material_id] += score
+                # 得分只增不减，已排在游标之前的资料不会再回到结果中
+                if after is not None and (scores[material_id], material_id) >= after:
+                    del scores[material_id]
+                    passed.add(material_id)
+
+            if index == len(terms) - 1:
+                break
+            threshold = self._rank_threshold(scores, remaining, top_k, after)
+            if threshold is not None and remaining < threshold:
+                pruned = True
+                scores = defaultdict(float, {
+                    material_id: score for material_id, score in scores.items() if score + remaining >= threshold
+                })
+
+        top = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], item[0]))
+        return (None if pruned else len(scores) + len(passed)), top
+
+    def _term_scores(
+        self, db: Session, term: str, term_idf: float, average_lengths: Dict[str, float], condition
+    ) -> Dict[int, float]:
+        """
+        单个词项对满足 condition 的资料的得分：按资料聚合加权、长度归一化后的词频，再做 BM25 饱和
+        """
+        rows = db.query(
+            SearchPosting.material_id,
+            SearchPosting.field,
+            SearchPosting.term_frequency,
+            SearchDocument.title_length,
+            SearchDocument.description_length,
+            SearchDocument.content_length
+        ).join(
+            SearchDocument, SearchDocument.material_id == SearchPosting.material_id
+        ).filter(
+            SearchPosting.term == term,
+            condition
+        )
+
+        weights = settings.SEARCH_FIELD_WEIGHTS
+        b = settings.SEARCH_BM25_B
+        pseudo_frequency = defaultdict(float)
+        for material_id, field, frequency, title_length, description_length, content_length in rows:
+            field_length = {
+                "title": title_length,
+                "description": description_length,
+                "content": content_length
+            }[field]
+            average_length = average_lengths[field] or 1.0
+            normalization = 1 - b + b * field_length / average_length
+            pseudo_frequency[material_id] += weights.get(field, 1.0) * frequency / normalization
+
+        k1 = settings.SEARCH_BM25_K1
+        return {
+            material_id: term_idf * frequency / (k1 + frequency)
+            for material_id, frequency in pseudo_frequency.items()
+        }
+
+    def _score_bound(self, term_idf: float, max_frequency: int, average_lengths: Dict[str, float]) -> float:
+        """
+        词项得分的上界
+
+        字段长度不小于该字段中的词频，而 tf / (1 - b + b * tf / avgdl) 随 tf 单调递增，
+        所以每个字段的加权词频不超过按最大词频、字段长度等于最大词频算出的值。
+        最大词频未知（为 0）时退化为 BM25 饱和上界 idf。
+        """
+        if not max_frequency:
+            return term_idf
+        weights = settings.SEARCH_FIELD_WEIGHTS
+        b = settings.SEARCH_BM25_B
+        frequency = 0.0
+        for field in INDEXED_FIELDS:
+            average_length = average_lengths[field] or 1.0
+            normalization = 1 - b + b * max_frequency / average_length
+            frequency += weights.get(field, 1.0) * max_frequency / normalization
+        k1 = settings.SEARCH_BM25_K1
+        # 留出浮点误差余量，避免因舍入差异误剪枝
+        return term_idf * frequency / (k1 + frequency) * (1 + 1e-9)
+
+    def _rank_threshold(
+        self, scores: Dict[int, float], remaining: float, top_k: int, after: Optional[Tuple[float, int]]
+    ) -> Optional[float]:
+        """
+        当前第 top_k 名得分（最终得分的下界）；只统计得分加上剩余上界后仍排在游标之后的资料，
+        不足 top_k 条时返回 None
+        """
+        eligible = [
+            score for material_id, score in scores.items()
+            if after is None or (score + remaining, material_id) < after
+        ]
+        if len(eligible) < top_k:
+            return None
+        return heapq.nlargest(top_k, eligible)[-1]
+
+    def estimate_matches(self, db: Session, query: str) -> Optional[int]:
+        """
+        根据文档频率估算匹配资料数（不考虑权限和过滤条件，偏大）：
+        每个片段取其词项中最小的文档频率，各片段求和，不超过资料总数
+        """
+        clauses = tokenize_query(query)
+        terms = analyze_query(query)
+        if not terms:
+            return 0
+        frequencies = dict(
+            db.query(SearchTerm.term, SearchTerm.document_frequency).filter(SearchTerm.term.in_(terms))
+        )
+        estimate = sum(min(frequencies.get(term, 0) for term in clause) for clause in clauses)
+        document_count, _ = self._get_corpus_stats(db)
+        return min(estimate, document_count)
+
+    def _idf(self, document_count: int, document_frequency: int) -> float:
+        return math.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def _get_corpus_stats(self, db: Session) -> Tuple[int, Dict[str, float]]:
+        """
+        获取资料总数和各字段平均长度（进程内缓存 CORPUS_STATS_TTL 秒）
+        """
+        now = time.monotonic()
+        if self._corpus_stats is None or now >= self._corpus_stats_expires_at:
+            document_count, title_avg, description_avg, content_avg = db.query(
+                func.count(SearchDocument.material_id),
+                func.avg(SearchDocument.title_length),
+                func.avg(SearchDocument.description_length),
+                func.avg(SearchDocument.content_length)
+            ).one()
+            self._corpus_stats = (document_count or 0, {
+                "title": float(title_avg or 0),
+                "description": float(description_avg or 0),
+                "content": float(content_avg or 0)
+            })
+            self._corpus_stats_expires_at = now + CORPUS_STATS_TTL
+        return self._corpus_stats
+
+    def _indexed_terms(self, db: Session, material_id: int) -> Set[str]:
+        return {
+            term for (term,) in db.query(SearchPosting.term).filter(
+                SearchPosting.material_id == material_id
+            ).distinct()
+        }
+
+    def _delete_postings(self, db: Session, material_id: int) -> None:
+        db.query(SearchPosting).filter(
+            SearchPosting.material_id == material_id
+        ).delete(synchronize_session=False)
+
+    def _decrement_document_frequency(self, db: Session, terms: Set[str]) -> None:
+        if not terms:
+            return
+        terms = list(terms)
+        db.query(SearchTerm).filter(SearchTerm.term.in_(terms)).update(
+            {SearchTerm.document_frequency: SearchTerm.document_frequency - 1},
+            synchronize_session=False
+        )
+        db.query(SearchTerm).filter(
+            SearchTerm.term.in_(terms),
+            SearchTerm.document_frequency <= 0
+        ).delete(synchronize_session=False)
+
+    def _upsert_terms(self, db: Session, rows: List[Dict]) -> None:
+        """
+        插入词项统计，词项已存在时累加文档频率、最大词频取较大值
+
+        MySQL / SQLite / PostgreSQL 用单条 upsert 语句，并发索引同一新词项时不会主键冲突；
+        其他数据库先更新已有词项再插入其余词项。
+        最大词频只增不减（删除资料后仍是有效的上界），重建索引时重新计算。
+        """
+        dialect = db.get_bind().dialect.name
+        if dialect in ("mysql", "mariadb"):
+            stmt = mysql_insert(SearchTerm).values(rows)
+            db.execute(stmt.on_duplicate_key_update(
+                document_frequency=SearchTerm.document_frequency + stmt.inserted.document_frequency,
+                max_term_frequency=self._greater(SearchTerm.max_term_frequency, stmt.inserted.max_term_frequency)
+            ))
+            return
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+            stmt = insert(SearchTerm).values(rows)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[SearchTerm.term],
+                set_={
+                    "document_frequency": SearchTerm.document_frequency + stmt.excluded.document_frequency,
+                    "max_term_frequency": self._greater(SearchTerm.max_term_frequency, stmt.excluded.max_term_frequency)
+                }
+            ))
+            return
+
+        terms = [row["term"] for row in rows]
+        existing = {
+            term for (term,) in db.query(SearchTerm.term).filter(SearchTerm.term.in_(terms))
+        }
+        for row in rows:
+            if row["term"] in existing:
+                db.query(SearchTerm).filter(SearchTerm.term == row["term"]).update(
+                    {
+                        SearchTerm.document_frequency: SearchTerm.document_frequency + row["document_frequency"],
+                        SearchTerm.max_term_frequency: self._greater(
+                            SearchTerm.max_term_frequency, row["max_term_frequency"]
+                        )
+                    },
+                    synchronize_session=False
+                )
+            else:
+                db.add(SearchTerm(**row))
+
+    def _greater(self, column, value):
+        return case((column < value, value), else_=column)
+
+    def _max_term_frequencies(self, field_tokens: Dict[str, List[str]]) -> Dict[str, int]:
+        """
+        资料中每个词项在各字段中的最大词频
+        """
+        frequencies = Counter()
+        for tokens in field_tokens.values():
+            for term, frequency in Counter(tokens).items():
+                frequencies[term] = max(frequencies[term], frequency)
+        return frequencies
+
+    def _build_postings(self, material_id: int, field_tokens: Dict[str, List[str]]) -> List[SearchPosting]:
+        postings = []
+        for field, tokens in field_tokens.items():
+            for term, frequency in Counter(tokens).items():
+                postings.append(SearchPosting(
+                    term=term,
+                    field=field,
+                    material_id=material_id,
+                    term_frequency=frequency
+                ))
+        return postings
+
+    def _build_document(self, material_id: int, field_tokens: Dict[str, List[str]]) -> SearchDocument:
+        return SearchDocument(
+            material_id=material_id,
+            title_length=len(field_tokens["title"]),
+            description_length=len(field_tokens["description"]),
+            content_length=len(field_tokens["content"])
+        )
+
+_BACKENDS = {
+    InvertedIndexBackend.name: InvertedIndexBackend,
+    LikeSearchBackend.name: LikeSearchBackend,
+}
+
+_backend: Optional[SearchBackend] = None
+
+def get_search_backend() -> SearchBackend:
+    """
+    获取当前配置的搜索后端（进程内单例）
+    """
+    global _backend
+    if _backend is None:
+        backend_cls = _BACKENDS.get(settings.SEARCH_BACKEND)
+        if backend_cls is None:
+            raise ValueError(f"未知的搜索后端: {settings.SEARCH_BACKEND}")
+        _backend = backend_cls()
+    return _backend
+
+def ensure_index(db: Session) -> None:
+    """
+    索引统计表为空而资料表非空时（首次启用或迁移后）重建索引
+    """
+    backend = get_search_backend()
+    if not isinstance(backend, InvertedIndexBackend):
+        return
+    if db.query(SearchDocument.material_id).first() is not None:
+        return
+    if db.query(Material.id).first() is None:
+        return
+    count = backend.rebuild(db)
+    logger.info(f"已重建搜索索引，共 {count} 条资料")
+
+if __name__ == "__main__":
+    from backend.app.db.session import SessionLocal
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    logger.info("重建搜索索引...")
+    count = get_search_backend().rebuild(db)
+    logger.info(f"搜索索引重建完成，共 {count} 条资料")
+    db.close()
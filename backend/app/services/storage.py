@@ -0,0 +1,166 @@
+import os
+import uuid
+import hashlib
+import logging
+from typing import AsyncIterator, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.models.blob import FileBlob
+
+logger = logging.getLogger(__name__)
+
+# 上传文件按块读写的大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+class UploadTooLargeError(Exception):
+    """上传文件超过大小限制"""
+
+def blob_path(sha256: str) -> str:
+    """
+    内容寻址的存储路径：UPLOAD_DIR/blobs/ab/cd/<sha256>
+    """
+    return os.path.join(settings.UPLOAD_DIR, "blobs", sha256[:2], sha256[2:4], sha256)
+
+def temp_path() -> str:
+    """
+    上传过程中使用的临时文件路径（目录 UPLOAD_DIR/tmp 在启动时创建）
+    """
+    return os.path.join(settings.UPLOAD_DIR, "tmp", uuid.uuid4().hex)
+
+async def upload_chunks(upload: UploadFile) -> AsyncIterator[bytes]:
+    """
+    按块读取上传文件
+    """
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+async def save_stream(chunks: AsyncIterator[bytes], destination: str, max_size: int) -> Tuple[int, str]:
+    """
+    将字节流按块写入 destination，返回 (文件大小, SHA-256)
+
+    写入时累计大小，超过 max_size 立即中止并删除已写入的部分；
+    先写临时文件再原子替换，失败不会留下不完整的目标文件。
+    """
+    digest = hashlib.sha256()
+    size = 0
+    part_path = f"{destination}.{uuid.uuid4().hex}.part"
+    try:
+        async with aiofiles.open(part_path, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError()
+                digest.update(chunk)
+                await out.write(chunk)
+        await aiofiles.os.replace(part_path, destination)
+    except BaseException:
+        if os.path.exists(part_path):
+            await aiofiles.os.remove(part_path)
+        raise
+    return size, digest.hexdigest()
+
+async def save_upload(upload: UploadFile, destination: str, max_size: int) -> Tuple[int, str]:
+    """
+    按块将上传文件写入 destination，返回 (文件大小, SHA-256)
+    """
+    return await save_stream(upload_chunks(upload), destination, max_size)
+
+async def hash_upload(upload: UploadFile, max_size: int) -> Tuple[int, str]:
+    """
+    只计算上传文件的大小和 SHA-256，不写磁盘
+    """
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in upload_chunks(upload):
+        size += len(chunk)
+        if size > max_size:
+            raise UploadTooLargeError()
+        digest.update(chunk)
+    return size, digest.hexdigest()
+
+def blob_exists(db: Session, sha256: str) -> bool:
+    return db.query(FileBlob.sha256).filter(
+        FileBlob.sha256 == sha256, FileBlob.ref_count > 0
+    ).first() is not None and os.path.exists(blob_path(sha256))
+
+class BlobMissingError(Exception):
+    """引用的文件已不存在且没有提供文件内容"""
+
+def _lock_blob(db: Session, sha256: str) -> Optional[FileBlob]:
+    """
+    锁定文件记录直到事务结束；引用计数的增减和文件的删除都在该锁下进行
+    """
+    return db.query(FileBlob).filter(FileBlob.sha256 == sha256).with_for_update().first()
+
+def acquire_blob(db: Session, sha256: str, size: int, source_path: Optional[str] = None) -> str:
+    """
+    增加文件引用计数并确保文件存在，返回存储路径（不提交事务，由调用方提交）
+
+    先在记录锁下取得引用再检查文件：文件已存在时丢弃 source_path（临时文件），
+    否则将 source_path 移入存储；没有 source_path 而文件已被删除时抛出 BlobMissingError。
+    """
+    updated = db.query(FileBlob).filter(FileBlob.sha256 == sha256).update(
+        {FileBlob.ref_count: FileBlob.ref_count + 1}, synchronize_session=False
+    )
+    if not updated:
+        try:
+            with db.begin_nested():
+                db.add(FileBlob(sha256=sha256, size=size, ref_count=1))
+        except IntegrityError:
+            # 并发上传同一文件时另一请求已插入记录
+            db.query(FileBlob).filter(FileBlob.sha256 == sha256).update(
+                {FileBlob.ref_count: FileBlob.ref_count + 1}, synchronize_session=False
+            )
+    
+    # 此时本事务持有记录的行锁，remove_blob 无法在检查和移动文件之间删除文件
+    path = blob_path(sha256)
+    if os.path.exists(path):
+        if source_path:
+            os.remove(source_path)
+        return path
+    if not source_path:
+        raise BlobMissingError(sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(source_path, path)
+    return path
+
+def release_blob(db: Session, sha256: str) -> bool:
+    """
+    减少文件引用计数，返回是否已无引用（调用方提交后应调用 remove_blob）
+
+    记录保留到 remove_blob 在锁下确认无引用后才删除。
+    """
+    db.query(FileBlob).filter(FileBlob.sha256 == sha256).update(
+        {FileBlob.ref_count: FileBlob.ref_count - 1}, synchronize_session=False
+    )
+    return db.query(FileBlob.sha256).filter(
+        FileBlob.sha256 == sha256, FileBlob.ref_count <= 0
+    ).first() is not None
+
+def remove_blob(db: Session, sha256: str) -> bool:
+    """
+    在记录锁下再次检查引用计数，仍无引用时删除文件和记录，返回是否已删除
+
+    release_blob 提交后可能有新的上传重新取得了引用，此时保留文件。
+    """
+    blob = _lock_blob(db, sha256)
+    if blob is None or blob.ref_count > 0:
+        db.rollback()
+        return False
+    path = blob_path(sha256)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        logger.warning(f"待删除的文件不存在: {path}")
+    db.delete(blob)
+    db.commit()
+    return True
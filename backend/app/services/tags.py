@@ -0,0 +1,248 @@
+"""
+标签层级
+
+层级关系保存在邻接表 tag_hierarchy 中，传递闭包保存在 tag_closure 中
+（每对祖先/后代一行，path_count 为两者之间的路径数）。
+修改层级关系必须通过本模块，闭包在同一事务中增量维护，并发的修改通过 tag_hierarchy_lock 依次执行；
+查询后代、祖先和子树下的资料各只需一次按索引的查询，与层级深度无关。
+"""
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Set
+
+from sqlalchemy import and_, bindparam, delete, desc, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.app.db.routing import read_only
+from backend.app.models.material import Material, material_tag
+from backend.app.models.tag import Tag, tag_closure, tag_hierarchy, tag_hierarchy_lock
+
+logger = logging.getLogger(__name__)
+
+class TagHierarchyError(Exception):
+    """层级关系无效（例如会形成环）"""
+
+def subtree_tag_ids(tag_ids: Iterable[int]):
+    """
+    标签及其所有后代的 ID（用于 IN 子查询）
+    """
+    tag_ids = list(tag_ids)
+    return select(Tag.id).where(
+        or_(
+            Tag.id.in_(tag_ids),
+            Tag.id.in_(select(tag_closure.c.descendant_id).where(tag_closure.c.ancestor_id.in_(tag_ids)))
+        )
+    )
+
+@read_only
+def get_tag_descendants(db: Session, tag_id: int) -> List[Tag]:
+    """获取标签的所有后代标签（不含自身）"""
+    return db.query(Tag).join(tag_closure, tag_closure.c.descendant_id == Tag.id).filter(
+        tag_closure.c.ancestor_id == tag_id
+    ).order_by(Tag.name, Tag.id).all()
+
+@read_only
+def get_tag_ancestors(db: Session, tag_id: int) -> List[Tag]:
+    """获取标签的所有祖先标签（不含自身）"""
+    return db.query(Tag).join(tag_closure, tag_closure.c.ancestor_id == Tag.id).filter(
+        tag_closure.c.descendant_id == tag_id
+    ).order_by(Tag.name, Tag.id).all()
+
+@read_only
+def get_subtree_materials(
+    db: Session, tag_id: int, user_id: int, skip: int = 0, limit: int = 100
+) -> List[Material]:
+    """获取标签及其所有后代标签下的资料（只包含公开资料或用户自己的资料）"""
+    return db.query(Material).filter(
+        Material.id.in_(
+            select(material_tag.c.material_id).where(material_tag.c.tag_id.in_(subtree_tag_ids([tag_id])))
+        ),
+        or_(
+            Material.owner_id == user_id,
+            Material.is_public == True
+        )
+    ).order_by(desc(Material.created_at), desc(Material.id)).offset(skip).limit(limit).all()
+
+def _lock_hierarchy(db: Session) -> None:
+    """
+    取得层级修改锁直到事务结束
+
+    以 UPDATE 取得锁（MySQL/PostgreSQL 为行锁，SQLite 为写锁），之后读取的闭包不会被并发修改，
+    环检查和闭包增量基于同一份数据；锁行不存在时先插入。
+    """
+    locked = db.execute(
+        update(tag_hierarchy_lock).where(tag_hierarchy_lock.c.id == 1).values(
+            version=tag_hierarchy_lock.c.version + 1
+        )
+    ).rowcount
+    if locked:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(tag_hierarchy_lock).values(id=1, version=1))
+    except IntegrityError:
+        # 并发请求已插入锁行
+        _lock_hierarchy(db)
+
+def _paths_through(db: Session, parent_id: int, child_id: int) -> Counter:
+    """
+    经过 parent → child 这条边的 (祖先, 后代) 路径数：
+    parent 及其祖先 × child 及其后代，路径数为两段路径数之积
+    """
+    ancestors = Counter({parent_id: 1})
+    ancestors.update(dict(db.execute(
+        select(tag_closure.c.ancestor_id, tag_closure.c.path_count).where(tag_closure.c.descendant_id == parent_id)
+    ).all()))
+    descendants = Counter({child_id: 1})
+    descendants.update(dict(db.execute(
+        select(tag_closure.c.descendant_id, tag_closure.c.path_count).where(tag_closure.c.ancestor_id == child_id)
+    ).all()))
+    return Counter({
+        (ancestor, descendant): ancestor_paths * descendant_paths
+        for ancestor, ancestor_paths in ancestors.items()
+        for descendant, descendant_paths in descendants.items()
+    })
+
+def _edge_exists(db: Session, parent_id: int, child_id: int) -> bool:
+    return db.execute(
+        select(tag_hierarchy.c.parent_id).where(
+            tag_hierarchy.c.parent_id == parent_id, tag_hierarchy.c.child_id == child_id
+        ).limit(1)
+    ).first() is not None
+
+def _is_ancestor(db: Session, ancestor_id: int, descendant_id: int) -> bool:
+    return db.execute(
+        select(tag_closure.c.ancestor_id).where(
+            tag_closure.c.ancestor_id == ancestor_id, tag_closure.c.descendant_id == descendant_id
+        )
+    ).first() is not None
+
+def add_tag_parent(db: Session, child_id: int, parent_id: int) -> bool:
+    """
+    添加层级关系 parent → child，并在同一事务中更新闭包
+
+    关系已存在时返回 False；会形成环时抛出 TagHierarchyError。
+    """
+    if child_id == parent_id:
+        raise TagHierarchyError("不能将标签的后代设为其父标签")
+    _lock_hierarchy(db)
+    if _is_ancestor(db, child_id, parent_id):
+        db.rollback()
+        raise TagHierarchyError("不能将标签的后代设为其父标签")
+    if _edge_exists(db, parent_id, child_id):
+        db.rollback()
+        return False
+
+    paths = _paths_through(db, parent_id, child_id)
+    existing = set(db.execute(
+        select(tag_closure.c.ancestor_id, tag_closure.c.descendant_id).where(
+            tag_closure.c.ancestor_id.in_({ancestor for ancestor, _ in paths}),
+            tag_closure.c.descendant_id.in_({descendant for _, descendant in paths})
+        )
+    ).all())
+
+    db.execute(insert(tag_hierarchy).values(parent_id=parent_id, child_id=child_id))
+    new_rows = [
+        {"ancestor_id": ancestor, "descendant_id": descendant, "path_count": count}
+        for (ancestor, descendant), count in paths.items() if (ancestor, descendant) not in existing
+    ]
+    if new_rows:
+        db.execute(insert(tag_closure), new_rows)
+    _add_path_counts(db, [(pair, count) for pair, count in paths.items() if pair in existing])
+    db.commit()
+    return True
+
+def remove_tag_parent(db: Session, child_id: int, parent_id: int) -> bool:
+    """
+    删除层级关系 parent → child，并在同一事务中更新闭包；关系不存在时返回 False
+    """
+    _lock_hierarchy(db)
+    if not _edge_exists(db, parent_id, child_id):
+        db.rollback()
+        return False
+
+    paths = _paths_through(db, parent_id, child_id)
+    db.execute(delete(tag_hierarchy).where(
+        tag_hierarchy.c.parent_id == parent_id, tag_hierarchy.c.child_id == child_id
+    ))
+    _add_path_counts(db, [(pair, -count) for pair, count in paths.items()])
+    db.execute(delete(tag_closure).where(
+        tag_closure.c.ancestor_id.in_({ancestor for ancestor, _ in paths}),
+        tag_closure.c.path_count <= 0
+    ))
+    db.commit()
+    return True
+
+def _add_path_counts(db: Session, changes) -> None:
+    params = [
+        {"a_id": ancestor, "d_id": descendant, "delta": delta}
+        for (ancestor, descendant), delta in changes if delta
+    ]
+    if params:
+        db.execute(
+            update(tag_closure).where(and_(
+                tag_closure.c.ancestor_id == bindparam("a_id"),
+                tag_closure.c.descendant_id == bindparam("d_id")
+            )).values(path_count=tag_closure.c.path_count + bindparam("delta")),
+            params
+        )
+
+def _compute_closure(edges: Iterable) -> Dict[int, Counter]:
+    """由邻接表计算每个标签到其后代的路径数；数据中已存在的环会被跳过并记录日志"""
+    children: Dict[int, List[int]] = {}
+    for parent_id, child_id in edges:
+        if parent_id is not None and child_id is not None:
+            children.setdefault(parent_id, []).append(child_id)
+
+    closure: Dict[int, Counter] = {}
+    visiting: Set[int] = set()
+
+    def visit(tag_id: int) -> Counter:
+        if tag_id in closure:
+            return closure[tag_id]
+        visiting.add(tag_id)
+        paths = Counter()
+        for child_id in children.get(tag_id, ()):
+            if child_id in visiting:
+                logger.warning("标签层级中存在环：%s → %s，已跳过", tag_id, child_id)
+                continue
+            paths[child_id] += 1
+            paths.update(visit(child_id))
+        visiting.discard(tag_id)
+        closure[tag_id] = paths
+        return paths
+
+    for tag_id in list(children):
+        visit(tag_id)
+    return closure
+
+def rebuild_tag_closure(db: Session) -> int:
+    """
+    由 tag_hierarchy 重新生成整个闭包，返回闭包行数
+
+    用于为已有数据初始化闭包，或在直接修改过层级表之后修复闭包。
+    """
+    _lock_hierarchy(db)
+    closure = _compute_closure(db.execute(select(tag_hierarchy.c.parent_id, tag_hierarchy.c.child_id)).all())
+    rows = [
+        {"ancestor_id": ancestor, "descendant_id": descendant, "path_count": count}
+        for ancestor, paths in closure.items()
+        for descendant, count in paths.items()
+    ]
+    db.execute(delete(tag_closure))
+    if rows:
+        db.execute(insert(tag_closure), rows)
+    db.commit()
+    return len(rows)
+
+def ensure_tag_closure(db: Session) -> None:
+    """
+    闭包为空而层级表中已有数据时（例如升级前创建的层级关系）生成闭包
+    """
+    if db.execute(select(tag_closure.c.ancestor_id).limit(1)).first() is not None:
+        return
+    if db.execute(select(tag_hierarchy.c.parent_id).limit(1)).first() is None:
+        return
+    count = rebuild_tag_closure(db)
+    logger.info(f"已生成标签层级闭包: {count} 行")
@@ -0,0 +1,67 @@
+import re
+import unicodedata
+from typing import Iterator, List, Optional, Tuple
+
+# 词项最大长度，与 SearchPosting.term 列宽一致
+MAX_TERM_LENGTH = 64
+
+# 中日韩文字范围：平假名/片假名、CJK扩展A、CJK统一汉字、兼容汉字、韩文音节
+_CJK_RANGES = "぀-ヿ㐀-䶿一-鿿豈-﫿가-힯"
+
+# 将文本切分为连续的中日韩文字片段和拉丁文/数字单词
+_SEGMENT_RE = re.compile(f"([{_CJK_RANGES}]+)|([^\\W{_CJK_RANGES}]+)")
+
+def normalize(text: str) -> str:
+    """
+    文本规范化：全角转半角（NFKC）并转小写
+    """
+    return unicodedata.normalize("NFKC", text).lower()
+
+def segments(text: Optional[str]) -> Iterator[Tuple[str, bool]]:
+    """
+    按文字类型切分文本，返回 (片段, 是否为中日韩文字)
+    """
+    if not text:
+        return
+    for match in _SEGMENT_RE.finditer(normalize(text)):
+        cjk, word = match.groups()
+        if cjk:
+            yield cjk, True
+        else:
+            yield word[:MAX_TERM_LENGTH], False
+
+def ngrams(text: str, n: int) -> List[str]:
+    """
+    字符 n-gram
+    """
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    索引分词：拉丁文按单词切分；中日韩文字生成单字、二元和三元字符组，
+    使任意长度的中文子串查询都能转换为索引查找
+    """
+    tokens = []
+    for segment, is_cjk in segments(text):
+        if is_cjk:
+            tokens.extend(segment)
+            tokens.extend(ngrams(segment, 2))
+            tokens.extend(ngrams(segment, 3))
+        else:
+            tokens.append(segment)
+    return tokens
+
+def tokenize_query(query: Optional[str]) -> List[List[str]]:
+    """
+    查询分词：每个片段对应一组必须同时命中的词项
+
+    中文片段长度为1或2时直接查找对应的单字/二元组；
+    更长的片段拆成重叠的三元组，全部命中即视为包含该子串。
+    """
+    clauses = []
+    for segment, is_cjk in segments(query):
+        if is_cjk and len(segment) > 3:
+            clauses.append(list(dict.fromkeys(ngrams(segment, 3))))
+        else:
+            clauses.append([segment])
+    return clauses
@@ -0,0 +1,180 @@
+import os
+import re
+import uuid
+import shutil
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.models.upload_session import UploadSession
+from backend.app.services import storage
+
+logger = logging.getLogger(__name__)
+
+_PART_NAME = re.compile(r"^\d{5}$")
+
+class UploadSessionError(Exception):
+    """分片上传请求不合法（分片编号越界、分片缺失、大小超限等）"""
+
+def session_dir(session_id: str) -> str:
+    return os.path.join(settings.UPLOAD_DIR, "sessions", session_id)
+
+def part_path(session_id: str, part_number: int) -> str:
+    return os.path.join(session_dir(session_id), f"{part_number:05d}")
+
+def create_session(db: Session, owner_id: int, file_name: str, file_size: Optional[int] = None) -> UploadSession:
+    """
+    创建分片上传会话
+    """
+    if file_size is not None and file_size > settings.MAX_SESSION_UPLOAD_SIZE:
+        raise UploadSessionError(f"文件大小超过限制（{settings.MAX_SESSION_UPLOAD_SIZE / 1024 / 1024}MB）")
+
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        owner_id=owner_id,
+        file_name=os.path.basename(file_name),
+        file_size=file_size,
+        expires_at=datetime.utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    )
+    os.makedirs(session_dir(session.id), exist_ok=True)
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session
+
+def get_session(db: Session, session_id: str) -> Optional[UploadSession]:
+    """
+    获取未过期的上传会话
+    """
+    return db.query(UploadSession).filter(
+        UploadSession.id == session_id,
+        UploadSession.expires_at > datetime.utcnow()
+    ).first()
+
+def list_parts(session_id: str) -> List[Tuple[int, int]]:
+    """
+    已上传完成的分片，返回按编号排序的 [(分片编号, 大小)]
+
+    分片先写入临时文件再原子改名，目录中存在的分片文件都是完整的。
+    """
+    try:
+        names = os.listdir(session_dir(session_id))
+    except FileNotFoundError:
+        return []
+    parts = []
+    for name in names:
+        if _PART_NAME.match(name):
+            parts.append((int(name), os.path.getsize(os.path.join(session_dir(session_id), name))))
+    return sorted(parts)
+
+async def save_part(
+    db: Session,
+    session: UploadSession,
+    part_number: int,
+    chunks: AsyncIterator[bytes]
+) -> int:
+    """
+    保存一个分片，返回分片大小；重复上传同一编号的分片会覆盖原分片
+
+    不同编号的分片可以并行上传。目录操作和数据库提交在线程池中执行，不阻塞事件循环。
+    """
+    if not 1 <= part_number <= settings.UPLOAD_MAX_PARTS:
+        raise UploadSessionError(f"分片编号必须在 1 到 {settings.UPLOAD_MAX_PARTS} 之间")
+
+    # 单个分片的上限同时受剩余总大小限制
+    parts = await run_in_threadpool(list_parts, session.id)
+    uploaded = sum(size for number, size in parts if number != part_number)
+    max_size = min(settings.UPLOAD_PART_MAX_SIZE, settings.MAX_SESSION_UPLOAD_SIZE - uploaded)
+
+    await run_in_threadpool(os.makedirs, session_dir(session.id), exist_ok=True)
+    try:
+        size, _ = await storage.save_stream(chunks, part_path(session.id, part_number), max_size)
+    except storage.UploadTooLargeError:
+        raise UploadSessionError("分片大小超过限制")
+
+    # 有进展的会话顺延过期时间
+    session.expires_at = datetime.utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    await run_in_threadpool(db.commit)
+    return size
+
+def assemble_parts(session: UploadSession) -> Tuple[str, int, str]:
+    """
+    将分片按编号顺序拼接为临时文件，返回 (临时文件路径, 文件大小, SHA-256)
+
+    分片按块流式复制，不会整体读入内存；分片编号必须从 1 开始连续。
+    """
+    parts = list_parts(session.id)
+    if not parts:
+        raise UploadSessionError("尚未上传任何分片")
+    missing = [number for number in range(1, parts[-1][0] + 1) if number not in dict(parts)]
+    if missing:
+        raise UploadSessionError(f"缺少分片: {', '.join(str(number) for number in missing[:20])}")
+
+    total = sum(size for _, size in parts)
+    if total > settings.MAX_SESSION_UPLOAD_SIZE:
+        raise UploadSessionError(f"文件大小超过限制（{settings.MAX_SESSION_UPLOAD_SIZE / 1024 / 1024}MB）")
+    if session.file_size is not None and total != session.file_size:
+        raise UploadSessionError(f"文件大小不一致：声明 {session.file_size} 字节，实际 {total} 字节")
+
+    digest = hashlib.sha256()
+    destination = storage.temp_path()
+    try:
+        with open(destination, "wb") as out:
+            for number, _ in parts:
+                with open(part_path(session.id, number), "rb") as part:
+                    while True:
+                        chunk = part.read(storage.UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                        out.write(chunk)
+    except BaseException:
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
+    return destination, total, digest.hexdigest()
+
+def delete_session(db: Session, session: UploadSession) -> None:
+    """
+    删除会话记录及其分片（完成或取消上传时调用）
+    """
+    session_id = session.id
+    db.delete(session)
+    db.commit()
+    shutil.rmtree(session_dir(session_id), ignore_errors=True)
+
+def cleanup_stale_sessions(db: Session) -> int:
+    """
+    清理过期的会话及没有对应记录的分片目录，返回清理的会话数
+    """
+    expired = db.query(UploadSession).filter(UploadSession.expires_at <= datetime.utcnow()).all()
+    for session in expired:
+        db.delete(session)
+    db.commit()
+    for session in expired:
+        shutil.rmtree(session_dir(session.id), ignore_errors=True)
+
+    # 进程在创建会话或删除记录后崩溃可能留下孤立目录
+    root = os.path.join(settings.UPLOAD_DIR, "sessions")
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        names = []
+    active = {
+        session_id for (session_id,) in
+        db.query(UploadSession.id).filter(UploadSession.id.in_(names)).all()
+    } if names else set()
+    cutoff = datetime.utcnow().timestamp() - settings.UPLOAD_SESSION_TTL
+    for name in names:
+        path = os.path.join(root, name)
+        if name not in active and os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+    if expired:
+        logger.info(f"已清理 {len(expired)} 个过期的上传会话")
+    return len(expired)
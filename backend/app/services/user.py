@@ -1,9 +1,56 @@
-from typing import Optional, List
+import threading
+from typing import Dict, Optional, List
 from sqlalchemy.orm import Session
+from backend.app.core.cache import TTLCache
+from backend.app.core.config import settings
 from backend.app.models.user import User
-from backend.app.schemas.user import UserCreate, UserUpdate
+from backend.app.schemas.user import UserCreate, UserInDB, UserUpdate
 from backend.app.core.security import get_password_hash, verify_password
 
+class UserSnapshotCache:
+    """
+    已验证令牌 -> 用户快照的缓存（供 deps.get_current_user 使用）
+
+    快照是与数据库会话无关的 UserInDB 对象。修改、删除、停用用户时调用 invalidate，
+    递增该用户的版本号，使其所有令牌的缓存立即失效。多进程部署时失效只作用于当前进程，
+    其他进程最多在 AUTH_CACHE_TTL 秒后读到新数据。
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def get(self, token: str) -> Optional[UserInDB]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        user_id, version, snapshot = entry
+        if version != self.version(user_id):
+            self._entries.pop(token)
+            return None
+        return snapshot
+
+    def set(self, token: str, snapshot: UserInDB, version: int, ttl: float) -> None:
+        """
+        version 为读取用户数据之前取得的版本号，读取期间用户被修改时该缓存条目不会生效
+        """
+        self._entries.set(token, (snapshot.id, version, snapshot), ttl=ttl)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+# 全局用户快照缓存
+user_cache = UserSnapshotCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+
 def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     """
     通过ID获取用户
@@ -61,8 +108,27 @@ def update_user(db: Session, user: User, user_in: UserUpdate) -> User:
     
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(user.id)
     return user
 
+def set_user_active(db: Session, user: User, is_active: bool) -> User:
+    """
+    激活或停用用户，停用后该用户的令牌立即失效
+    """
+    user.is_active = is_active
+    db.commit()
+    db.refresh(user)
+    user_cache.invalidate(user.id)
+    return user
+
+def update_password_hash(db: Session, user: User, hashed_password: str) -> None:
+    """
+    保存按新参数重新计算的密码哈希
+    """
+    user.hashed_password = hashed_password
+    db.commit()
+    user_cache.invalidate(user.id)
+
 def delete_user(db: Session, user_id: int) -> bool:
     """
     删除用户
@@ -73,4 +139,5 @@ def delete_user(db: Session, user_id: int) -> bool:
     
     db.delete(user)
     db.commit()
+    user_cache.invalidate(user_id)
     return True 
\ No newline at end of file
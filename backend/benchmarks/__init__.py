@@ -0,0 +1 @@
+# 空文件，标记为包 
\ No newline at end of file
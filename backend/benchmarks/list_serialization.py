@@ -0,0 +1,114 @@
+"""
+列表接口序列化基准测试
+
+对比资料列表和帖子列表的两种序列化方式（内存 SQLite，数据由脚本生成）：
+- 默认方式：查询 ORM 对象 → response_model 校验 → 转换为 JSON 兼容对象 → json 编码（与 FastAPI 相同）
+- 快速方式（FAST_JSON_RESPONSES）：只查询需要的列 → 字典 → orjson 编码
+
+用法：python -m backend.benchmarks.list_serialization [--rows 2000] [--limit 100] [--repeat 50]
+"""
+import json
+import time
+import argparse
+import statistics
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from backend.app.core.responses import FastJSONResponse
+from backend.app.db import init_db  # noqa: F401  注册所有模型
+from backend.app.db.base import Base
+from backend.app.models.forum import Post
+from backend.app.models.material import Material
+from backend.app.models.user import User
+from backend.app.schemas.forum import Post as PostSchema
+from backend.app.schemas.material import Material as MaterialSchema
+from backend.app.services import forum as forum_service
+from backend.app.services import materials as materials_service
+
+def _populate(db: Session, rows: int) -> None:
+    now = datetime(2024, 1, 1)
+    users = [
+        User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x", is_active=True)
+        for i in range(20)
+    ]
+    db.add_all(users)
+    db.flush()
+    for i in range(rows):
+        created_at = now + timedelta(seconds=i)
+        db.add(Material(
+            title=f"资料 {i}", description="示例资料描述" * 5, content="正文内容 " * 2000,
+            file_path=f"/data/uploads/{i}.pdf", file_type="pdf", file_size=1024 * i,
+            file_hash=f"{i:064x}", file_name=f"{i}.pdf", owner_id=users[i % 20].id,
+            is_public=True, view_count=i, like_count=i // 2,
+            created_at=created_at, updated_at=created_at,
+        ))
+        db.add(Post(
+            title=f"帖子 {i}", content="帖子内容 " * 200, owner_id=users[i % 20].id,
+            view_count=i, like_count=i // 3, comment_count=i % 7,
+            created_at=created_at, updated_at=created_at,
+        ))
+    db.commit()
+
+def _default_json(adapter: TypeAdapter, items) -> bytes:
+    value = adapter.validate_python(items, from_attributes=True)
+    content = adapter.dump_python(value, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def _measure(engine, repeat: int, run: Callable[[Session], bytes]) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        # 每次使用新会话，避免身份映射缓存已加载的对象
+        with Session(engine) as db:
+            start = time.perf_counter()
+            run(db)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="生成的资料/帖子数量")
+    parser.add_argument("--limit", type=int, default=100, help="每页数量")
+    parser.add_argument("--repeat", type=int, default=50, help="每种方式的重复次数")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        _populate(db, args.rows)
+        user_id = db.query(User.id).first()[0]
+
+    materials_adapter = TypeAdapter(List[MaterialSchema])
+    posts_adapter = TypeAdapter(List[PostSchema])
+    cases = {
+        "GET /materials/": (
+            lambda db: _default_json(
+                materials_adapter, materials_service.get_materials_by_cursor(db, user_id, None, args.limit)[0]
+            ),
+            lambda db: FastJSONResponse(materials_service.get_material_rows(db, user_id, limit=args.limit)[0]).body,
+        ),
+        "GET /forum/posts": (
+            lambda db: _default_json(posts_adapter, forum_service.get_posts_by_cursor(db, None, args.limit)[0]),
+            lambda db: FastJSONResponse(forum_service.get_post_rows(db, limit=args.limit)[0]).body,
+        ),
+    }
+
+    print(f"rows={args.rows} limit={args.limit} repeat={args.repeat}")
+    print(f"{'endpoint':<18}{'default ms':>12}{'fast ms':>10}{'speedup':>10}")
+    for name, (default, fast) in cases.items():
+        # 两种方式的输出必须一致
+        with Session(engine) as db:
+            expected = json.loads(default(db))
+        with Session(engine) as db:
+            assert json.loads(fast(db)) == expected, f"{name} 快速序列化结果与默认方式不一致"
+
+        default_ms = statistics.median(_measure(engine, args.repeat, default)) * 1000
+        fast_ms = statistics.median(_measure(engine, args.repeat, fast)) * 1000
+        print(f"{name:<18}{default_ms:>12.2f}{fast_ms:>10.2f}{default_ms / fast_ms:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from backend.app.api.api import api_router
 from backend.app.core.config import settings
 from backend.app.core.events import create_start_app_handler, create_stop_app_handler
-from fastapi.responses import HTMLResponse
+from backend.app.core.middleware import QueryStatsMiddleware, UploadSizeLimitMiddleware
+from backend.app.core.security import PasswordHasherBusy
+from backend.app.core.static_pages import static_pages
+from fastapi.responses import HTMLResponse, JSONResponse
 
 # 配置日志
 logging.basicConfig(
@@ -31,6 +34,7 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 else:
     # 开发环境，允许所有源
@@ -40,6 +44,22 @@ else:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
+    )
+
+# 限制上传请求体大小，超限时在读取请求体的过程中提前中止
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_size=settings.MAX_UPLOAD_SIZE,
+    paths=[f"{settings.API_PREFIX}/materials/upload"],
+)
+
+# 统计每个请求执行的 SQL（Server-Timing 响应头和日志，标记疑似 N+1 查询）
+if settings.QUERY_STATS_ENABLED:
+    app.add_middleware(
+        QueryStatsMiddleware,
+        n_plus_one_threshold=settings.QUERY_STATS_N_PLUS_ONE_THRESHOLD,
+        server_timing=settings.QUERY_STATS_SERVER_TIMING,
     )
 
 # 注册路由
@@ -49,7 +69,17 @@ app.include_router(api_router, prefix=settings.API_PREFIX)
 app.add_event_handler("startup", create_start_app_handler(app))
 app.add_event_handler("shutdown", create_stop_app_handler(app))
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request, exc):
+    # 密码哈希队列已满（登录/注册高峰），提示客户端稍后重试
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "服务繁忙，请稍后重试"},
+        headers={"Retry-After": "1"},
+    )
+
 @app.get("/", response_class=HTMLResponse)
+@static_pages.page
 async def get_html():
     return """
     <!DOCTYPE html>
@@ -129,6 +159,7 @@ async def get_html():
     """
 
 @app.get("/dashboard", response_class=HTMLResponse)
+@static_pages.page
 async def get_dashboard():
     return """
     <!DOCTYPE html>
@@ -384,6 +415,7 @@ async def get_dashboard():
     """
 
 @app.get("/mindmaps-page", response_class=HTMLResponse)
+@static_pages.page
 async def get_mindmaps_page():
     return """
     <!DOCTYPE html>
@@ -758,6 +790,7 @@ async def get_mindmaps_page():
     """
 
 @app.get("/materials-page", response_class=HTMLResponse)
+@static_pages.page
 async def get_materials_page():
     return """
     <!DOCTYPE html>
@@ -1200,6 +1233,7 @@ async def get_materials_page():
     """
 
 @app.get("/settings-page", response_class=HTMLResponse)
+@static_pages.page
 async def get_settings_page():
     return """
     <!DOCTYPE html>
@@ -1573,6 +1607,7 @@ async def get_settings_page():
     """
 
 @app.get("/forum-page", response_class=HTMLResponse)
+@static_pages.page
 async def get_forum_page():
     return """
     <!DOCTYPE html>
@@ -2108,6 +2143,7 @@ async def get_forum_page():
     """
 
 @app.get("/register", response_class=HTMLResponse)
+@static_pages.page
 async def get_register_page():
     return """
     <!DOCTYPE html>
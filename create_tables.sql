@@ -27,6 +27,7 @@ CREATE TABLE IF NOT EXISTS mindmaps (
     is_public BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX ix_mindmaps_user_id_created_at_id (owner_id, created_at, id),
     FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -44,16 +45,23 @@ CREATE TABLE IF NOT EXISTS materials (
     id INT AUTO_INCREMENT PRIMARY KEY,
     title VARCHAR(100) NOT NULL,
     description TEXT,
-    content TEXT,
+    content MEDIUMTEXT,
     file_path VARCHAR(255),
     file_type VARCHAR(50),
+    file_size BIGINT,
+    file_hash CHAR(64),
+    file_name VARCHAR(255),
     owner_id INT NOT NULL,
     mindmap_id INT,
     view_count INT DEFAULT 0,
     like_count INT DEFAULT 0,
     is_public BOOLEAN DEFAULT FALSE,
+    extraction_status VARCHAR(16),
+    extraction_error VARCHAR(255),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_materials_extraction_status (extraction_status),
+    INDEX ix_materials_created_at_id (created_at, id),
     FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (mindmap_id) REFERENCES mindmaps(id) ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -78,6 +86,7 @@ CREATE TABLE IF NOT EXISTS forum_posts (
     comment_count INT DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX ix_forum_posts_created_at_id (created_at, id),
     FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -115,6 +124,84 @@ CREATE TABLE IF NOT EXISTS search_histories (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- 10. 搜索倒排索引表
+CREATE TABLE IF NOT EXISTS search_postings (
+    term VARCHAR(64) COLLATE utf8mb4_bin NOT NULL,
+    field VARCHAR(16) NOT NULL,
+    material_id INT NOT NULL,
+    term_frequency INT NOT NULL DEFAULT 1,
+    PRIMARY KEY (term, field, material_id),
+    INDEX ix_search_postings_material_id (material_id),
+    FOREIGN KEY (material_id) REFERENCES materials(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 11. 搜索词项统计表
+CREATE TABLE IF NOT EXISTS search_terms (
+    term VARCHAR(64) COLLATE utf8mb4_bin PRIMARY KEY,
+    document_frequency INT NOT NULL DEFAULT 0,
+    max_term_frequency INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 12. 搜索资料统计表
+CREATE TABLE IF NOT EXISTS search_documents (
+    material_id INT PRIMARY KEY,
+    title_length INT NOT NULL DEFAULT 0,
+    description_length INT NOT NULL DEFAULT 0,
+    content_length INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (material_id) REFERENCES materials(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 13. 内容寻址文件表
+CREATE TABLE IF NOT EXISTS file_blobs (
+    sha256 CHAR(64) PRIMARY KEY,
+    size BIGINT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 14. 分片上传会话表
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id CHAR(32) PRIMARY KEY,
+    owner_id INT NOT NULL,
+    file_name VARCHAR(255) NOT NULL,
+    file_size BIGINT,
+    expires_at DATETIME NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_upload_sessions_owner (owner_id),
+    INDEX idx_upload_sessions_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 15. 标签层级表
+CREATE TABLE IF NOT EXISTS tag_hierarchy (
+    parent_id INT NOT NULL,
+    child_id INT NOT NULL,
+    PRIMARY KEY (parent_id, child_id),
+    FOREIGN KEY (parent_id) REFERENCES tags(id) ON DELETE CASCADE,
+    FOREIGN KEY (child_id) REFERENCES tags(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 16. 标签层级闭包表（祖先/后代对及路径数）
+CREATE TABLE IF NOT EXISTS tag_closure (
+    ancestor_id INT NOT NULL,
+    descendant_id INT NOT NULL,
+    path_count INT NOT NULL DEFAULT 1,
+    PRIMARY KEY (ancestor_id, descendant_id),
+    INDEX ix_tag_closure_descendant_ancestor (descendant_id, ancestor_id),
+    FOREIGN KEY (ancestor_id) REFERENCES tags(id) ON DELETE CASCADE,
+    FOREIGN KEY (descendant_id) REFERENCES tags(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 17. 标签层级修改锁（单行，修改层级关系时更新该行以串行执行）
+CREATE TABLE IF NOT EXISTS tag_hierarchy_lock (
+    id INT PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO tag_hierarchy_lock (id, version) VALUES (1, 0) ON DUPLICATE KEY UPDATE id=id;
+
 -- 创建默认管理员用户
 -- 密码为admin123的哈希值(使用bcrypt生成)
 INSERT INTO users (username, email, hashed_password, is_active, is_admin)